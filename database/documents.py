@@ -10,8 +10,12 @@ from unicodedata import category
 import motor
 from beanie import Document, init_beanie
 from beanie.odm.fields import Indexed
+from beanie.odm.operators.find.comparison import In
 from pydantic.main import BaseModel
-from pymongo.errors import ServerSelectionTimeoutError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
+
+from database.records import migrate_level_keys
 
 logger = getLogger(__name__)
 
@@ -105,6 +109,50 @@ class Starboard(Document):
     async def search(cls, id_):
         return await cls.find_one(cls.message_id == id_)
 
+    @classmethod
+    async def add_star(
+        cls, message_id: int, user_id: int, jump: str
+    ) -> Optional[Starboard]:
+        """Atomically star a message once per user.
+
+        Return the updated entry without the reacted list,
+        or None if the user has already starred the message.
+        """
+        query = {"message_id": message_id, "reacted": {"$ne": user_id}}
+        update = {
+            "$addToSet": {"reacted": user_id},
+            "$inc": {"stars": 1},
+            "$setOnInsert": {"jump": jump, "starboard_id": 0},
+        }
+        collection = cls.get_motor_collection()
+        try:
+            entry = await collection.find_one_and_update(
+                query,
+                update,
+                projection={"reacted": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # The entry exists. Either the user already starred it,
+            # or a concurrent reaction created it first.
+            entry = await collection.find_one_and_update(
+                query,
+                update,
+                projection={"reacted": 0},
+                return_document=ReturnDocument.AFTER,
+            )
+        return cls.parse_obj(entry) if entry else None
+
+    @classmethod
+    async def set_starboard_id(cls, message_id: int, starboard_id: int) -> bool:
+        """Store the starboard message of an entry, unless one was already posted."""
+        result = await cls.get_motor_collection().update_one(
+            {"message_id": message_id, "starboard_id": 0},
+            {"$set": {"starboard_id": starboard_id}},
+        )
+        return bool(result.modified_count)
+
 
 class StoreItems(Document):
     """Collection of items to be bought."""
@@ -127,6 +175,21 @@ class EXPRanks(BaseModel):
     bo: str = "Grandmaster"
 
 
+def inc_nullable(amounts: Dict[str, int]) -> List[dict]:
+    """Pipeline update that increments fields, treating missing or null as 0.
+
+    A plain $inc fails on fields stored as null, like wins and losses.
+    """
+    return [
+        {
+            "$set": {
+                field: {"$add": [{"$ifNull": [f"${field}", 0]}, amount]}
+                for field, amount in amounts.items()
+            }
+        }
+    ]
+
+
 class XPOnly(BaseModel):
     user_id: Indexed(int, unique=True)
     alias: str
@@ -140,7 +203,7 @@ class ExperiencePoints(Document):
     alias: str
     alerts_enabled: bool
     rank: EXPRanks = EXPRanks()
-    xp: int = 0
+    xp: Indexed(int) = 0
     xp_avg: Union[Optional[List], Optional[Dict[str, List[int]]]] = {
         "ta": [0, 0, 0, 0, 0],  # TA
         "mc": [0, 0, 0, 0, 0],  # MC
@@ -154,8 +217,10 @@ class ExperiencePoints(Document):
     losses: Optional[int]
 
     async def increment_verified(self) -> int:
-        self.verified_count += 1
-        await self.save()
+        """Atomically increment the verified count and return the new value."""
+        self.verified_count = await self.increment(
+            self.user_id, "verified_count", verified_count=1
+        )
         return self.verified_count
 
     async def check_if_unranked(self, category: str) -> bool:
@@ -166,41 +231,98 @@ class ExperiencePoints(Document):
     async def xp_leaderboard(cls) -> ExperiencePoints:
         return await cls.find().sort("-xp").project(XPOnly).to_list()
 
+    @classmethod
+    async def xp_position(cls, xp: int) -> int:
+        """Leaderboard position of an XP amount. Players with equal XP share it."""
+        return await cls.find(cls.xp > xp).count() + 1
+
     @classmethod
     async def find_user(cls, user_id: int) -> ExperiencePoints:
         """Find a user."""
         return await cls.find_one(cls.user_id == user_id)
 
+    @classmethod
+    async def find_users(cls, user_ids: List[int]) -> List[ExperiencePoints]:
+        """Find many users with a single query."""
+        return await cls.find(In(cls.user_id, user_ids)).to_list()
+
+    @classmethod
+    async def bulk_tournament_update(
+        cls, users: List[ExperiencePoints], xp: Dict[int, int]
+    ):
+        """Credit tournament XP and store each user's shifted XP averages.
+
+        All users are written with one unordered bulk write.
+        """
+        if not users:
+            return
+        await cls.get_motor_collection().bulk_write(
+            [
+                UpdateOne(
+                    {"user_id": user.user_id},
+                    {"$inc": {"xp": xp[user.user_id]}, "$set": {"xp_avg": user.xp_avg}},
+                )
+                for user in users
+            ],
+            ordered=False,
+        )
+
+    @classmethod
+    async def increment(
+        cls, user_id: int, returning: Optional[str] = None, **amounts: int
+    ) -> Optional[int]:
+        """Atomically increment fields of a user.
+
+        Return the new value of the `returning` field, if given.
+        """
+        collection = cls.get_motor_collection()
+        if returning is None:
+            await collection.update_one({"user_id": user_id}, inc_nullable(amounts))
+            return None
+
+        user = await collection.find_one_and_update(
+            {"user_id": user_id},
+            inc_nullable(amounts),
+            projection={returning: 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        return user[returning] if user else None
+
+    @classmethod
+    async def bulk_increment(cls, deltas: Dict[int, Dict[str, int]]):
+        """Atomically increment fields of many users in a single bulk write."""
+        if not deltas:
+            return
+        await cls.get_motor_collection().bulk_write(
+            [
+                UpdateOne({"user_id": user_id}, inc_nullable(amounts))
+                for user_id, amounts in deltas.items()
+            ],
+            ordered=False,
+        )
+
     @classmethod
     async def add_win(cls, user_id: int):
-        user = await cls.find_user(user_id)
-        if user.wins is None:
-            user.wins = 0
-        user.wins += 1
-        await user.save()
+        await cls.increment(user_id, wins=1)
 
     @classmethod
     async def add_loss(cls, user_id: int):
-        user = await cls.find_user(user_id)
-        if user.losses is None:
-            user.losses = 0
-        user.losses += 1
-        await user.save()
+        await cls.increment(user_id, losses=1)
 
     @classmethod
-    async def change_xp(cls, user_id: int, amount: int):
-        """Change a user's XP by a specific amount."""
-        user: ExperiencePoints = await cls.find_one(cls.user_id == user_id)
-        user.xp += amount
-        await user.save()
+    async def change_xp(cls, user_id: int, amount: int) -> Optional[int]:
+        """Change a user's XP by a specific amount. Return the new total."""
+        return await cls.increment(user_id, "xp", xp=amount)
 
     @classmethod
     async def duel_end(cls, *, winner: int, loser: int, wager: int):
         """Deal duel earnings and incremement W/L."""
-        await cls.change_xp(winner, wager)
-        await cls.change_xp(loser, -wager)
-        await cls.add_win(winner)
-        await cls.add_loss(loser)
+        await cls.bulk_increment(
+            {
+                winner: {"xp": wager, "wins": 1},
+                loser: {"xp": -wager, "losses": 1},
+            }
+        )
 
     @classmethod
     async def get_alias(cls, user_id: int) -> str:
@@ -240,6 +362,7 @@ async def database_init():
     )
 
     try:
+        await migrate_level_keys(client.doombot.Record)
         await init_beanie(
             database=client.doombot, document_models=Document.__subclasses__()
         )
@@ -4,6 +4,7 @@ from typing import Any, List, NoReturn, Optional
 
 from beanie import Document
 from beanie.odm.fields import Indexed
+from beanie.odm.operators.find.comparison import In
 from beanie.odm.operators.find.evaluation import RegEx
 from pydantic import BaseModel, Field
 
@@ -65,6 +66,11 @@ class Map(Document):
         """Find a single map using its workshop code."""
         return await cls.find_one(cls.code == map_code)
 
+    @classmethod
+    async def find_codes(cls, map_codes: List[str]) -> List[Map]:
+        """Find the maps with any of the given workshop codes."""
+        return await cls.find(In(cls.code, map_codes)).to_list()
+
     @classmethod
     async def check_code(cls, map_code: str) -> NoReturn:
         """Check if a map exists with specific map_code."""
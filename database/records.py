@@ -1,15 +1,17 @@
 from __future__ import annotations
 import re
 
-from typing import Any, Generator, List, Optional, Set
+from typing import Any, Dict, List, Literal, Optional, Set, Tuple
 
-import discord
 from beanie import Document, Link
-from beanie.odm.operators.find.evaluation import RegEx
-from pydantic import BaseModel, Field
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pydantic import BaseModel, Field, root_validator
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError
 
-from database.maps import MapCodes, MapLevels
+from database.maps import MapLevels
 from logging import getLogger
+from utils.utilities import display_record, logging_util, preprocess_level_name
 
 
 logger = getLogger(__name__)
@@ -29,22 +31,6 @@ class AllLevelsAgg(BaseModel):
         return self.id.level
 
 
-class WorldRecordsSubAggregate(Document):
-    """Projection model for World Records aggregation."""
-
-    code: str
-    level: str
-
-
-class WorldRecordsAggregate(BaseModel):
-    """Projection model for World Records aggregation."""
-
-    id: Link[WorldRecordsSubAggregate] = Field(None, alias="_id")
-    user_id: int
-    record: float
-    url: str
-
-
 class UniquePlayers(BaseModel):
     """Projection model for unique players in a Record aggregation."""
 
@@ -56,30 +42,6 @@ class UniquePlayers(BaseModel):
         return f"{self.name}, {self.user_id}"
 
 
-class CurrentRecordPlacement(BaseModel):
-    """Projection model for $rank mongo aggregation."""
-
-    rank: int
-
-
-class MapDataLookup(BaseModel):
-    """Projection model for $lookup with RecordMapLookup."""
-
-    creator: str
-    map_name: str
-
-
-class RecordMapLookup(BaseModel):
-    """Projection model for Record and Map data."""
-
-    user_id: int
-    code: str
-    level: str
-    record: float
-    verified: str
-    map_data: Optional[MapDataLookup]
-
-
 class Record(Document):
     """Collection of personal best records."""
 
@@ -91,6 +53,55 @@ class Record(Document):
     message_id: Optional[int]
     hidden_id: Optional[int]
     attachment_url: Optional[str] = Field("", alias="url")
+    level_key: Optional[str]
+
+    class Collection:
+        indexes = [
+            IndexModel(
+                [("code", ASCENDING), ("level_key", ASCENDING), ("record", ASCENDING)]
+            ),
+            IndexModel(
+                [("user_id", ASCENDING), ("code", ASCENDING), ("level_key", ASCENDING)],
+                unique=True,
+            ),
+            IndexModel([("hidden_id", ASCENDING)]),
+        ]
+
+    @root_validator(skip_on_failure=True)
+    def _sync_level_key(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep the normalized level used for exact matching in sync with level."""
+        values["level_key"] = preprocess_level_name(values["level"])
+        return values
+
+    @classmethod
+    async def query_shapes(cls) -> Dict[str, dict]:
+        """Filters of every query the class methods run, with sample values."""
+        code, level, user_id = "00000", "Level", 0
+        return {
+            "filter_search code": await cls.filter_search_({"map_code": code}),
+            "filter_search code level": await cls.filter_search_(
+                {"map_code": code, "map_level": level}
+            ),
+            "filter_search user": await cls.filter_search_({"user_id": user_id}),
+            "filter_search_single code level user": await cls.filter_search_(
+                {"map_code": code, "map_level": level, "user_id": user_id}
+            ),
+            "find_current_rank": {
+                "code": code,
+                "level_key": preprocess_level_name(level),
+                "record": {"$lt": 0},
+                "user_id": {"$ne": user_id},
+            },
+            "find_personal_bests_page": {"user_id": user_id},
+            "find_personal_bests_page after": {
+                "user_id": user_id,
+                "$or": [
+                    {"code": {"$gt": code}},
+                    {"code": code, "level_key": {"$gt": preprocess_level_name(level)}},
+                ],
+            },
+            "hidden_id": {"hidden_id": user_id},
+        }
 
     @classmethod
     async def all_levels(cls) -> List[AllLevelsAgg]:
@@ -104,70 +115,57 @@ class Record(Document):
         )
 
     @classmethod
-    async def find_rec_map_info(cls, user_id):
-        """Find record data as well as corresponding map data."""
-        return (
-            await cls.find(cls.user_id == user_id)
-            .aggregate(
-                [
-                    {
-                        "$lookup": {
-                            "from": "Map",
-                            "localField": "code",
-                            "foreignField": "code",
-                            "as": "map_data",
-                        }
-                    },
-                    {
-                        "$unwind": {
-                            "path": "$map_data",
-                            "preserveNullAndEmptyArrays": True,
-                        }
-                    },
-                    {
-                        "$project": {
-                            "user_id": 1,
-                            "code": 1,
-                            "level": 1,
-                            "record": 1,
-                            "verified": 1,
-                            "map_data.creator": 1,
-                            "map_data.map_name": 1,
-                        }
-                    },
-                    {"$sort": {"code": 1, "level": 1}},
-                ],
-                projection_model=RecordMapLookup,
-            )
-            .to_list()
-        )
+    async def count_user(cls, user_id: int) -> int:
+        return await cls.find(cls.user_id == user_id).count()
 
     @classmethod
-    async def find_current_rank(
-        cls, map_code: str, map_level: str, user_id: int
-    ) -> CurrentRecordPlacement:
-        """Find the current rank placement of a record."""
-        sort_order = 1
-        if map_code == "R88AY" and map_level == "TOWER DEFENCE":
-            sort_order *= -1
+    async def find_personal_bests_page(
+        cls,
+        user_id: int,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        skip: int = 0,
+    ) -> List[Record]:
+        """Find one page of a user's records, sorted by code and level.
+
+        With after, the (code, level_key) of the last record on the previous
+        page, the page is read as a range on the user's index instead of
+        skipping over every earlier record.
+        """
+        query: Dict[str, Any] = {"user_id": user_id}
+        if after:
+            code, level_key = after
+            query["$or"] = [
+                {"code": {"$gt": code}},
+                {"code": code, "level_key": {"$gt": level_key}},
+            ]
+        records = cls.find(query).sort("+code", "+level_key")
+        if not after:
+            records = records.skip(skip)
+        return await records.limit(limit).to_list()
 
+    @classmethod
+    async def find_current_rank(
+        cls, map_code: str, map_level: str, record: float, user_id: int
+    ) -> int:
+        """Find the leaderboard placement a record has, or would have.
+
+        Counts the other users' records that are better, which is a range
+        scan on the (code, level_key, record) index.
+        """
+        level_key = preprocess_level_name(map_level)
+        better = "$lt" if sort_direction(map_code, level_key) == 1 else "$gt"
         return (
-            await cls.find(cls.code == map_code, cls.level == map_level)
-            .aggregate(
-                [
-                    {
-                        "$setWindowFields": {
-                            "sortBy": {"record": sort_order},
-                            "output": {"rank": {"$rank": {}}},
-                        }
-                    },
-                    {"$match": {"user_id": user_id}},
-                    {"$project": {"rank": 1}},
-                ],
-                projection_model=CurrentRecordPlacement,
+            await cls.get_motor_collection().count_documents(
+                {
+                    "code": map_code,
+                    "level_key": level_key,
+                    "record": {better: record},
+                    "user_id": {"$ne": user_id},
+                }
             )
-            .to_list()
-        )[0]
+            + 1
+        )
 
     @classmethod
     async def find_unique_players(cls) -> Set[str]:
@@ -175,72 +173,12 @@ class Record(Document):
         x = await cls.find().project(projection_model=UniquePlayers).to_list()
         return set(str(i) for i in x)
 
-    @classmethod
-    async def find_world_records_user(cls, user_id: int) -> List[WorldRecordsAggregate]:
-        """Find all the world records that a user has."""
-        return (
-            await cls.find(cls.verified == True)
-            .aggregate(
-                [
-                    {"$sort": {"record": 1}},
-                    {
-                        "$group": {
-                            "_id": {"code": "$code", "level": "$level"},
-                            "record": {"$first": "$record"},
-                            "user_id": {"$first": "$user_id"},
-                            "url": {"$first": "$url"},
-                        }
-                    },
-                    {"$match": {"user_id": user_id}},
-                    {"$sort": {"_id.code": 1, "_id.level": 1}},
-                ],
-                projection_model=WorldRecordsAggregate,
-            )
-            .to_list()
-        )
-
-    @classmethod
-    async def find_world_records(cls, **filters) -> List[WorldRecordsAggregate]:
-        """Find all the world records that a user has."""
-
-        map_code = filters.get("map_code")
-        verified = filters.get("verified")
-
-        search_filter = {}
-
-        if map_code:
-            search_filter.update({"code": map_code})
-        if verified:
-            search_filter.update({"verified": verified})
-
-        return (
-            await cls.find(search_filter)
-            .aggregate(
-                [
-                    {"$sort": {"record": 1}},
-                    {
-                        "$group": {
-                            "_id": {"code": "$code", "level": "$level"},
-                            "record": {"$first": "$record"},
-                            "user_id": {"$first": "$user_id"},
-                            "url": {"$first": "$url"},
-                        }
-                    },
-                    {"$sort": {"_id.level": 1}},
-                ],
-                projection_model=WorldRecordsAggregate,
-            )
-            .to_list()
-        )
-
     @classmethod
     async def filter_search(cls, **filters: Any) -> List[Record]:
         """Get all amps with a particular filter."""
         sort_order = "+record"
-        if (
-            filters.get("map_code") == "R88AY"
-            and filters.get("map_level") == "TOWER DEFENCE"
-        ):
+        level_key = preprocess_level_name(filters.get("map_level") or "")
+        if sort_direction(filters.get("map_code"), level_key) == -1:
             sort_order = "-record"
 
         search_filter = await cls.filter_search_(filters)
@@ -263,12 +201,7 @@ class Record(Document):
         if map_code:
             search_filter.update({"code": map_code})
         if map_level:
-            _level = (
-                discord.utils.escape_markdown(map_level)
-                .replace(")", "\)")
-                .replace("(", "\(")
-            )
-            search_filter.update(RegEx("level", f"^{_level}$"))
+            search_filter.update({"level_key": preprocess_level_name(map_level)})
 
         if user_id:
             search_filter.update({"user_id": user_id})
@@ -276,44 +209,232 @@ class Record(Document):
             search_filter.update({"verified": verified})
         return search_filter
 
+
+class LevelMeta(Document):
+    """How records of a level are ranked and displayed.
+
+    Levels without an entry are timed, where lower records are better.
+    """
+
+    code: str
+    level_key: str
+    # "score" levels rank higher records first.
+    direction: Literal["time", "score"] = "time"
+    display: Literal["time", "score"] = "time"
+
+    class Collection:
+        indexes = [
+            IndexModel([("code", ASCENDING), ("level_key", ASCENDING)], unique=True),
+        ]
+
     @classmethod
-    async def get_level_names(cls, map_code: str) -> List[str]:
-        """Get the names of levels in a map code."""
-        all_levels = (
-            await cls.find(cls.code == map_code)
-            .aggregate(
-                [
-                    {"$project": {"level": 1}},
-                    {"$group": {"_id": {"level": "$level"}}},
-                    {"$sort": {"_id.level": 1}},
-                ],
-                projection_model=AllLevelsAgg,
+    async def load(cls):
+        """Load every entry into LEVEL_META, seeding the defaults if empty."""
+        entries = await cls.find().to_list()
+        if not entries:
+            entries = [cls(**meta) for meta in DEFAULT_LEVEL_META]
+            await cls.insert_many(entries)
+        LEVEL_META.clear()
+        LEVEL_META.update({(meta.code, meta.level_key): meta for meta in entries})
+        logger.info(logging_util("Level Meta Loaded", f"{len(LEVEL_META)} LEVELS"))
+
+
+DEFAULT_LEVEL_META = [
+    {
+        "code": "R88AY",
+        "level_key": "TOWER DEFENCE",
+        "direction": "score",
+        "display": "score",
+    },
+]
+
+LEVEL_META: Dict[Tuple[str, str], LevelMeta] = {}
+
+
+def sort_direction(code: str, level_key: str) -> int:
+    """Return 1 if lower records are better on a level, -1 if higher ones are."""
+    meta = LEVEL_META.get((code, level_key))
+    return -1 if meta and meta.direction == "score" else 1
+
+
+def display_level_record(code: str, level_key: str, record: float) -> str:
+    """Display a record in the format of its level."""
+    meta = LEVEL_META.get((code, level_key))
+    if meta and meta.display == "score":
+        return f"{record:g}"
+    return display_record(record)
+
+
+class WorldRecord(Document):
+    """Best verified record of every level.
+
+    Kept in sync when records are verified, rejected or deleted,
+    so world record lookups don't aggregate the whole Record collection.
+    """
+
+    code: str
+    level: str
+    level_key: str
+    user_id: int
+    record: float
+    url: str = ""
+
+    class Collection:
+        indexes = [
+            IndexModel([("code", ASCENDING), ("level_key", ASCENDING)], unique=True),
+            IndexModel([("user_id", ASCENDING), ("code", ASCENDING)]),
+        ]
+
+    @classmethod
+    async def find_code(cls, map_code: str) -> List[WorldRecord]:
+        """Find the world records of every level of a map."""
+        return await cls.find(cls.code == map_code).sort("+level").to_list()
+
+    @classmethod
+    async def find_user(cls, user_id: int) -> List[WorldRecord]:
+        """Find all the world records that a user has."""
+        return await cls.find(cls.user_id == user_id).sort("+code", "+level").to_list()
+
+    @classmethod
+    async def offer(cls, record: Record):
+        """Make a verified record the world record if it beats the current one."""
+        better = "$gt" if sort_direction(record.code, record.level_key) == 1 else "$lt"
+        try:
+            await cls.get_motor_collection().update_one(
+                {
+                    "code": record.code,
+                    "level_key": record.level_key,
+                    "record": {better: record.record},
+                },
+                {
+                    "$set": {
+                        "level": record.level,
+                        "user_id": record.user_id,
+                        "record": record.record,
+                        "url": record.attachment_url,
+                    }
+                },
+                upsert=True,
             )
+        except DuplicateKeyError:
+            # The current world record is at least as good.
+            pass
+
+    @classmethod
+    async def recompute(cls, code: str, level_key: str):
+        """Recompute the world record of one level from its verified records."""
+        best = (
+            await Record.find(
+                Record.code == code,
+                Record.level_key == level_key,
+                Record.verified == True,
+            )
+            .sort(("record", sort_direction(code, level_key)))
+            .limit(1)
             .to_list()
         )
-        return [str(x) for x in all_levels]
+        collection = cls.get_motor_collection()
+        if not best:
+            await collection.delete_one({"code": code, "level_key": level_key})
+            return
+        record = best[0]
+        await collection.update_one(
+            {"code": code, "level_key": level_key},
+            {
+                "$set": {
+                    "level": record.level,
+                    "user_id": record.user_id,
+                    "record": record.record,
+                    "url": record.attachment_url,
+                }
+            },
+            upsert=True,
+        )
 
     @classmethod
-    async def get_codes(cls, starts_with) -> Generator[tuple[Any, str], Any, None]:
-        """Get map codes that start with a specific string."""
-        all_codes = (
-            await cls.find(RegEx("code", "^" + starts_with, "i"))
+    async def rebuild(cls):
+        """Rebuild every world record from the Record collection."""
+        world_records = await (
+            Record.get_motor_collection()
             .aggregate(
                 [
-                    {"$project": {"code": 1}},
-                    {"$sort": {"code": 1}},
-                    {"$limit": 25},
+                    {"$match": {"verified": True}},
+                    {"$sort": {"record": 1}},
                     {
-                        "$lookup": {
-                            "from": "Map",
-                            "localField": "code",
-                            "foreignField": "code",
-                            "as": "map_data",
+                        "$group": {
+                            "_id": {"code": "$code", "level_key": "$level_key"},
+                            "level": {"$first": "$level"},
+                            "record": {"$first": "$record"},
+                            "user_id": {"$first": "$user_id"},
+                            "url": {"$first": "$url"},
+                        }
+                    },
+                    {
+                        "$project": {
+                            "_id": 0,
+                            "code": "$_id.code",
+                            "level_key": "$_id.level_key",
+                            "level": 1,
+                            "record": 1,
+                            "user_id": 1,
+                            "url": 1,
                         }
                     },
                 ],
-                projection_model=MapCodes,
+                allowDiskUse=True,
             )
-            .to_list()
+            .to_list(None)
+        )
+        collection = cls.get_motor_collection()
+        await collection.delete_many({})
+        if world_records:
+            await collection.insert_many(world_records, ordered=False)
+        for code, level_key in LEVEL_META:
+            if sort_direction(code, level_key) == -1:
+                await cls.recompute(code, level_key)
+        logger.info(
+            logging_util("World Records Rebuilt", f"{len(world_records)} LEVELS")
+        )
+
+    @classmethod
+    async def rebuild_if_empty(cls):
+        if not await cls.get_motor_collection().count_documents({}, limit=1):
+            await cls.rebuild()
+
+
+async def migrate_level_keys(collection: AsyncIOMotorCollection):
+    """Backfill level_key on records written before it existed.
+
+    Runs before indexes are built, since the unique index includes level_key.
+    """
+    requests = [
+        UpdateOne(
+            {"_id": record["_id"]},
+            {"$set": {"level_key": preprocess_level_name(record["level"])}},
+        )
+        async for record in collection.find(
+            {"level_key": {"$exists": False}}, projection={"level": 1}
         )
-        return ((x.get_data(), str(x)) for x in all_codes)
+    ]
+    if requests:
+        await collection.bulk_write(requests, ordered=False)
+        logger.info(logging_util("Level Keys Migrated", f"{len(requests)} RECORDS"))
+
+
+def uses_collscan(plan: dict) -> bool:
+    """Return True if a query plan scans the whole collection."""
+    if plan.get("stage") == "COLLSCAN":
+        return True
+    children = plan.get("inputStages", [])
+    if "inputStage" in plan:
+        children = children + [plan["inputStage"]]
+    return any(uses_collscan(child) for child in children)
+
+
+async def check_query_plans():
+    """Warn about Record queries that fall back to a collection scan."""
+    collection = Record.get_motor_collection()
+    for name, query in (await Record.query_shapes()).items():
+        explanation = await collection.find(query).explain()
+        if uses_collscan(explanation["queryPlanner"]["winningPlan"]):
+            logger.warning(logging_util("Query Plan COLLSCAN", name.upper()))
@@ -2,14 +2,18 @@ from __future__ import annotations
 
 from datetime import datetime
 from logging import getLogger
-from typing import Generator, List, Literal, Optional, Union
+from typing import Dict, Generator, List, Literal, Optional, Union
 
-from beanie import Document
+from beanie import Document, PydanticObjectId
+from beanie.odm.fields import Indexed
 from beanie.odm.operators.find.logical import Or
 from discord.utils import MISSING
 from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError
 
-from database.documents import EXPRanks
+from database.documents import ExperiencePoints, EXPRanks
+from utils.errors import RecordNotFaster
 from utils.utilities import format_missions, tournament_category_map
 
 CategoryLiteral = Literal["ta", "mc", "hc", "bo"]
@@ -89,6 +93,114 @@ class TournamentRecordsLookup(BaseModel):
     user_data: Optional[ShortUserData]
 
 
+class TournamentSubmission(Document):
+    """Tournament record submissions, one per user per category."""
+
+    tournament_id: int
+    category: CategoryLiteral
+    user_id: int
+    record: float
+    attachment_url: str
+
+    class Collection:
+        indexes = [
+            IndexModel(
+                [
+                    ("tournament_id", ASCENDING),
+                    ("category", ASCENDING),
+                    ("user_id", ASCENDING),
+                ],
+                unique=True,
+            ),
+            IndexModel(
+                [
+                    ("tournament_id", ASCENDING),
+                    ("category", ASCENDING),
+                    ("record", ASCENDING),
+                ]
+            ),
+        ]
+
+    @classmethod
+    async def find_submission(
+        cls, tournament_id: int, category: CategoryLiteral, user_id: int
+    ) -> Optional[TournamentSubmission]:
+        return await cls.find_one(
+            cls.tournament_id == tournament_id,
+            cls.category == category,
+            cls.user_id == user_id,
+        )
+
+    @classmethod
+    async def find_tournament(cls, tournament_id: int) -> List[TournamentSubmission]:
+        """Find every submission of a tournament in submission order."""
+        return await cls.find(cls.tournament_id == tournament_id).sort("_id").to_list()
+
+    @classmethod
+    async def submit(
+        cls,
+        tournament_id: int,
+        category: CategoryLiteral,
+        user_id: int,
+        record: float,
+        attachment_url: str,
+    ):
+        """Insert a submission or replace a slower one in a single write.
+
+        A slower or equal record leaves the filter unmatched, so the upsert
+        collides with the unique index instead of overwriting. Two first
+        submissions racing also collide, so the loser retries as a plain
+        update against the record that won.
+        """
+        query = {
+            "tournament_id": tournament_id,
+            "category": category,
+            "user_id": user_id,
+            "record": {"$gt": record},
+        }
+        update = {"$set": {"record": record, "attachment_url": attachment_url}}
+        collection = cls.get_motor_collection()
+        try:
+            await collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            result = await collection.update_one(query, update)
+            if not result.matched_count:
+                raise RecordNotFaster(
+                    "Record must be faster than previously submitted record."
+                )
+
+    @classmethod
+    async def import_embedded(cls, tournament: Tournament):
+        """Copy records embedded in a tournament document into this collection."""
+        requests = [
+            UpdateOne(
+                {
+                    "tournament_id": tournament.tournament_id,
+                    "category": category,
+                    "user_id": record.user_id,
+                },
+                {
+                    "$setOnInsert": {
+                        "record": record.record,
+                        "attachment_url": record.attachment_url,
+                    }
+                },
+                upsert=True,
+            )
+            for category in tournament.get_categories()
+            for record in getattr(tournament, category).records
+        ]
+        if requests:
+            await cls.get_motor_collection().bulk_write(requests, ordered=False)
+
+    @classmethod
+    async def import_missing(cls):
+        """Import the embedded records of every tournament with no submissions yet."""
+        for tournament in await Tournament.find().to_list():
+            if not await cls.find_one(cls.tournament_id == tournament.tournament_id):
+                await cls.import_embedded(tournament)
+
+
 class Tournament(Document):
     """Collection of Tournament data."""
 
@@ -121,36 +233,46 @@ class Tournament(Document):
 
     @classmethod
     async def get_records(
-        cls, category, rank=MISSING
+        cls, category, rank=MISSING, tournament_id: Optional[int] = None
     ) -> List[Optional[TournamentRecordsLookup]]:
+        """Get a category leaderboard, by default of the latest tournament."""
+        if tournament_id is None:
+            latest = await cls.find_latest()
+            if not latest:
+                return []
+            tournament_id = latest.tournament_id
+
         aggregation = [
-            {"$sort": {"tournament_id": -1}},
-            {"$limit": 1},
-            {"$project": {f"{category}.records": 1}},
-            {"$unwind": {"path": f"${category}.records"}},
-            {"$sort": {f"{category}.records": 1}},
+            {"$match": {"tournament_id": tournament_id, "category": category}},
+            {"$sort": {"record": 1}},
             {
                 "$lookup": {
                     "from": "ExperiencePoints",
-                    "localField": f"{category}.records.user_id",
+                    "localField": "user_id",
                     "foreignField": "user_id",
                     "as": "user_data",
                 }
             },
             {"$unwind": {"path": "$user_data", "preserveNullAndEmptyArrays": True}},
+        ]
+        if rank is not MISSING:
+            aggregation.append({"$match": {f"user_data.rank.{category}": f"{rank}"}})
+        aggregation.append(
             {
                 "$project": {
-                    f"{category}.records": 1,
+                    f"{category}.records": {
+                        "record": "$record",
+                        "user_id": "$user_id",
+                        "attachment_url": "$attachment_url",
+                    },
                     "user_data.alias": 1,
                     "user_data.rank": 1,
                 }
-            },
-        ]
-        if rank is not MISSING:
-            aggregation.append({"$match": {f"user_data.rank.{category}": f"{rank}"}})
+            }
+        )
 
         return (
-            await cls.find()
+            await TournamentSubmission.find()
             .aggregate(aggregation, projection_model=TournamentRecordsLookup)
             .to_list()
         )
@@ -209,6 +331,59 @@ class Tournament(Document):
         return missions
 
 
+class TournamentSnapshot:
+    """Records and participants of a tournament.
+
+    Every participant is loaded with a single query, so end of tournament
+    duties can look up ranks and aliases without hitting the database.
+    """
+
+    def __init__(
+        self,
+        records: Dict[str, List[Union[TournamentRecords, TournamentSubmission]]],
+        users: Dict[int, ExperiencePoints],
+    ):
+        self.records = records
+        self.users = users
+
+    @classmethod
+    async def load(cls, tournament: Tournament) -> TournamentSnapshot:
+        records = {category: [] for category in tournament.get_categories()}
+        submissions = await TournamentSubmission.find_tournament(
+            tournament.tournament_id
+        )
+        for submission in submissions:
+            if submission.category in records:
+                records[submission.category].append(submission)
+
+        # Tournaments from before submissions had their own collection.
+        if not submissions:
+            for category in records:
+                records[category] = getattr(tournament, category).records
+
+        user_ids = {r.user_id for category in records.values() for r in category}
+        users = await ExperiencePoints.find_users(list(user_ids))
+        return cls(records, {user.user_id: user for user in users})
+
+    def get_user(self, user_id: int) -> Optional[ExperiencePoints]:
+        return self.users.get(user_id)
+
+    def alias(self, user_id: int) -> str:
+        user = self.users.get(user_id)
+        if user:
+            return user.alias
+        return "No name"
+
+    def rank(self, user_id: int, category: CategoryLiteral) -> str:
+        user = self.users.get(user_id)
+        if user:
+            return getattr(user.rank, category)
+        return "Unranked"
+
+    def dont_submit(self, user_id: int) -> bool:
+        return bool(getattr(self.users.get(user_id), "dont_submit", False))
+
+
 class DuelPlayer(BaseModel):
     """Player in duel."""
 
@@ -229,7 +404,28 @@ class Duel(Document):
     wager: int
     standby_time: datetime
     start_time: Optional[datetime]
-    end_time: Optional[datetime]
+    end_time: Optional[Indexed(datetime)]
+    paid: bool = False
+
+    @classmethod
+    async def find_expired(cls, duel_id: PydanticObjectId) -> Optional[Duel]:
+        """Find a started duel if its end time has passed."""
+        return await cls.find_one(cls.id == duel_id, cls.end_time <= datetime.now())
+
+    @classmethod
+    async def claim_payout(cls, duel_id: PydanticObjectId) -> bool:
+        """Mark a duel as paid. False if it already was."""
+        result = await cls.get_motor_collection().update_one(
+            {"_id": duel_id, "paid": {"$ne": True}}, {"$set": {"paid": True}}
+        )
+        return bool(result.modified_count)
+
+    @classmethod
+    async def release_payout(cls, duel_id: PydanticObjectId):
+        """Undo claim_payout after the payout failed."""
+        await cls.get_motor_collection().update_one(
+            {"_id": duel_id}, {"$set": {"paid": False}}
+        )
 
     @classmethod
     async def find_duel(cls, user_id) -> Duel:
@@ -2,7 +2,6 @@ import asyncio
 import datetime
 from logging import getLogger
 import random
-from typing import List
 
 import aiohttp
 import discord
@@ -19,7 +18,12 @@ from database.documents import (
     Voting,
 )
 from database.records import Record
-from database.tournament import Announcement, Duel, Tournament
+from database.tournament import (
+    Announcement,
+    Duel,
+    Tournament,
+    TournamentSubmission,
+)
 from slash.mods import VotingView
 
 from slash.tournament import end_tournament, start_tournament
@@ -38,12 +42,21 @@ from utils.constants import (
     EMOJI_SUGG,
 )
 from utils.enums import Emoji
+from utils.rank_card import RankCardRenderer
+from utils.autocomplete import RecordAutocomplete
+from utils.scheduler import EVENT_LEAD_TIME, SENTINEL, Scheduler, normalize_deadline
+from utils.search import SearchIndex
+from utils.starboard import StarboardCoalescer
+from utils.tags import TagCatalogue
 from utils.utilities import display_record, logging_util, star_emoji
 from views.records import VerificationView
 from views.roles import ColorRolesView, PronounRoles, ServerRelatedPings, TherapyRole
 
 logger = getLogger(__name__)
 
+# A duel whose settlement failed is retried after this long.
+DUEL_RETRY_DELAY = datetime.timedelta(seconds=30)
+
 DOOMBOT_ASCII = r"""
 ______  _____  _____ ___  _________  _____  _____
 |  _  \|  _  ||  _  ||  \/  || ___ \|  _  ||_   _|
@@ -84,7 +97,10 @@ class DoomBot(discord.Client):
         self.top_records = None
 
         self.channel_map = None
-        self.ws_list = None
+        self.ws_index = None
+        self.provisional_xp = None
+        # Bumped by every change, so a build that overlapped one isn't kept.
+        self.provisional_xp_version = 0
         self.verification_views_added = False
         self.persistent_views_added = False
         self.guild = None
@@ -96,8 +112,23 @@ class DoomBot(discord.Client):
 
         self.session = aiohttp.ClientSession()
 
+        self.scheduler = Scheduler()
+        self.starboard = StarboardCoalescer()
+        self.record_autocomplete = RecordAutocomplete()
+        self.tags = TagCatalogue()
+        self.rank_cards = RankCardRenderer()
+        # Starting and ending tournaments changes XP, channels and the
+        # provisional XP cache, so those jobs never overlap.
+        self.scheduler.register(
+            "tournament", self.tournament_deadline, serialized=True
+        )
+        self.scheduler.register("announcement", self.announcement_deadline)
+        self.scheduler.register("event", self.event_deadline)
+        self.scheduler.register("duel", self.duel_deadline)
+
     async def close(self) -> None:
         await self.session.close()
+        self.rank_cards.close()
         return await super().close()
 
     async def on_ready(self):
@@ -141,18 +172,10 @@ class DoomBot(discord.Client):
         self.allow_submissions.update(send_messages=True)
         self.disallow_submissions.update(send_messages=False)
 
-        if not self.annoucement_checker.is_running():
-            logger.info(logging_util("Task Initialize", "ANNOUNCEMENTS"))
-            self.annoucement_checker.start()
-        if not self.tournament_checker.is_running():
-            logger.info(logging_util("Task Initialize", "TOURNAMENT"))
-            self.tournament_checker.start()
-        if not self.events_checker.is_running():
-            logger.info(logging_util("Task Initialize", "EVENTS"))
-            self.events_checker.start()
-        if not self.duel_checker.is_running():
-            logger.info(logging_util("Task Initialze", "DUELS"))
-            self.duel_checker.start()
+        if not self.scheduler.is_running():
+            logger.info(logging_util("Task Initialize", "SCHEDULER"))
+            await self.load_schedules()
+            self.scheduler.start()
         if not self.cool_lounge.is_running():
             logger.info(logging_util("Task Initialze", "COOL LOUNGE"))
             self.cool_lounge.start()
@@ -161,7 +184,7 @@ class DoomBot(discord.Client):
 
             url = "https://workshop.codes/wiki/dictionary"
             async with session.get(url) as resp:
-                self.ws_list = (
+                self.ws_index = SearchIndex(
                     (await resp.text())
                     .lstrip("[")
                     .rstrip("]")
@@ -209,77 +232,118 @@ class DoomBot(discord.Client):
                 reason="Cool Lounge +",
             )
 
-    @tasks.loop(seconds=30)
-    async def duel_checker(self):
-        """Check for duel endings."""
-        all_duels: List[Duel] = await Duel.find_all().to_list()
-        if not all_duels:
-            return
+    async def load_schedules(self):
+        """Load every upcoming deadline into the scheduler."""
+        await TournamentSubmission.import_missing()
+        tournament = await Tournament.find_active()
+        if tournament:
+            # It may have been running when submissions moved collections.
+            await TournamentSubmission.import_embedded(tournament)
+            self.schedule_tournament(tournament)
+
+        for announcement in await Announcement.find().to_list():
+            self.scheduler.schedule(
+                "announcement", announcement.schedule, announcement.id
+            )
 
-        for duel in all_duels:
-            if not duel.end_time:
-                return
-            if duel.end_time > datetime.datetime.now():
-                return
+        for event in await Events.find(Events.started == False).to_list():
+            self.schedule_event(event)
 
-            if not duel.player1.record and not duel.player2.record:
-                await self.get_guild(GUILD_ID).get_channel_or_thread(
-                    DUELS_ID
-                ).get_partial_message(duel.channel_msg).delete()
-                await self.get_guild(GUILD_ID).get_channel_or_thread(
-                    duel.thread
-                ).delete()
-                await duel.delete()
-                return
+        for duel in await Duel.find(Duel.end_time != None).to_list():
+            self.scheduler.schedule("duel", duel.end_time, duel.id)
 
-            if duel.player1.record is None:
-                duel.player1.record = duel.player2.record * 2
-            elif duel.player2.record is None:
-                duel.player2.record = duel.player1.record * 2
+    def schedule_tournament(self, tournament: Tournament):
+        """Arm the start and end deadlines of a tournament."""
+        self.scheduler.schedule("tournament", tournament.schedule_start, tournament.id)
+        self.scheduler.schedule("tournament", tournament.schedule_end, tournament.id)
 
-            if duel.player1.record < duel.player2.record:
-                await ExperiencePoints.duel_end(
-                    winner=duel.player1.user_id,
-                    loser=duel.player2.user_id,
-                    wager=duel.wager,
-                )
-                winner = duel.player1.user_id
+    def schedule_event(self, event: Events):
+        """Arm the deadline to open the channels of an event."""
+        self.scheduler.schedule(
+            "event", event.schedule_start - EVENT_LEAD_TIME, event.id
+        )
 
-            else:
-                await ExperiencePoints.duel_end(
-                    winner=duel.player2.user_id,
-                    loser=duel.player1.user_id,
-                    wager=duel.wager,
-                )
-                winner = duel.player2.user_id
-            winner = self.get_guild(GUILD_ID).get_member(winner)
-            msg = (
-                await self.get_guild(GUILD_ID)
-                .get_channel(DUELS_ID)
-                .fetch_message(duel.channel_msg)
+    async def duel_deadline(self, duel_id):
+        """Settle the duel of a deadline, retrying later if settling fails."""
+        duel = await Duel.find_expired(duel_id)
+        if not duel:
+            return
+        try:
+            await self.settle_duel(duel)
+        except Exception:
+            logger.exception(f"Duel settlement failed: {duel.id}")
+            self.scheduler.schedule(
+                "duel", datetime.datetime.now() + DUEL_RETRY_DELAY, duel.id
             )
-            await msg.edit(content=f"THE WINNER IS {winner.mention}!\n" + msg.content)
-            await self.get_channel(duel.thread).archive(locked=True)
+
+    async def settle_duel(self, duel: Duel):
+        """Pay out the wager of an ended duel and close it.
+
+        The payout is claimed on the document first, so a duel is paid once
+        even if settling is retried or the duel is forfeited at the same time.
+        """
+        guild = self.get_guild(GUILD_ID)
+        if not duel.player1.record and not duel.player2.record:
+            try:
+                await guild.get_channel_or_thread(DUELS_ID).get_partial_message(
+                    duel.channel_msg
+                ).delete()
+                await guild.get_channel_or_thread(duel.thread).delete()
+            except discord.NotFound:
+                pass
             await duel.delete()
+            return
 
-    @tasks.loop(seconds=30)
-    async def tournament_checker(self):
-        """Periodically check for the start/end of tournaments."""
-        tournament = await Tournament.find_active()
-        if not tournament:
+        if duel.player1.record is None:
+            duel.player1.record = duel.player2.record * 2
+        elif duel.player2.record is None:
+            duel.player2.record = duel.player1.record * 2
+
+        if duel.player1.record < duel.player2.record:
+            winner, loser = duel.player1.user_id, duel.player2.user_id
+        else:
+            winner, loser = duel.player2.user_id, duel.player1.user_id
+
+        if await Duel.claim_payout(duel.id):
+            try:
+                await ExperiencePoints.duel_end(
+                    winner=winner, loser=loser, wager=duel.wager
+                )
+            except Exception:
+                await Duel.release_payout(duel.id)
+                raise
+
+            winner = guild.get_member(winner)
+            try:
+                msg = await guild.get_channel(DUELS_ID).fetch_message(
+                    duel.channel_msg
+                )
+                await msg.edit(
+                    content=f"THE WINNER IS {winner.mention}!\n" + msg.content
+                )
+            except discord.NotFound:
+                pass
+        thread = self.get_channel(duel.thread)
+        if thread:
+            await thread.archive(locked=True)
+        await duel.delete()
+
+    async def tournament_deadline(self, document_id):
+        """Start or end a tournament when one of its deadlines is due."""
+        tournament = await Tournament.get(document_id)
+        if not tournament or not tournament.active:
             return
 
         schedules = [tournament.schedule_start, tournament.schedule_end]
-        sentinel = datetime.datetime(year=1, month=1, day=1)
 
         # Deactivate ended tournament
-        if all([s == sentinel for s in schedules]):
+        if all([s == SENTINEL for s in schedules]):
             tournament.active = False
             await tournament.save()
             return
 
         # Check to start tournament
-        if datetime.datetime.now() >= tournament.schedule_start != sentinel:
+        if datetime.datetime.now() >= tournament.schedule_start != SENTINEL:
             logger.info(logging_util("Task Start", "STARTING TOURNAMENT"))
             await self.submissions_channel.set_permissions(
                 self.everyone,
@@ -290,7 +354,7 @@ class DoomBot(discord.Client):
             return
 
         # Check to end tournament
-        if datetime.datetime.now() >= tournament.schedule_end != sentinel:
+        if datetime.datetime.now() >= tournament.schedule_end != SENTINEL:
             logger.info(logging_util("Task Start", "ENDING TOURNAMENT"))
             await self.submissions_channel.set_permissions(
                 self.everyone,
@@ -300,51 +364,52 @@ class DoomBot(discord.Client):
             await end_tournament(self, tournament)
             return
 
-    @tasks.loop(seconds=30)
-    async def annoucement_checker(self):
-        """Periodically check for scheduled tournament announcements."""
-        announcements = await Announcement.find().to_list()
-        for announcement in announcements:
-            if datetime.datetime.now() >= announcement.schedule:
-                embed = discord.Embed.from_dict(announcement.embed)
-                info_channel = self.get_channel(TOURNAMENT_INFO_ID)
-                await info_channel.send(announcement.mentions, embed=embed)
-                await announcement.delete()
-
-    @tasks.loop(seconds=30)
-    async def events_checker(self):
-        """Periodically check for events."""
-        events = await Events.find().to_list()
-
-        for event in events:
-            if (
-                not event.started
-                and event.schedule_start
-                > datetime.datetime.now() - datetime.timedelta(minutes=3)
-            ):
-                category = await self.guild.create_category(
-                    "Event", reason="Event Night start", position=0
-                )
-                text = await category.create_text_channel("Event Chat")
-                voice = await category.create_voice_channel("Event Voicechat")
-                event.category = category.id
-                event.text = text.id
-                event.voice = voice.id
-                event.started = True
-                await event.save()
-                await asyncio.sleep(5)
-                await self.http.modify_guild_scheduled_event(
-                    GUILD_ID,
-                    event.event_id,
-                    channel_id=voice.id,
-                    entity_type=2,
-                    entity_metadata=None,
-                )
-                await self.http.modify_guild_scheduled_event(
-                    GUILD_ID,
-                    event.event_id,
-                    status=2,
-                )
+    async def announcement_deadline(self, document_id):
+        """Send a scheduled tournament announcement."""
+        announcement = await Announcement.get(document_id)
+        if not announcement:
+            return
+        if datetime.datetime.now() < normalize_deadline(announcement.schedule):
+            return
+        embed = discord.Embed.from_dict(announcement.embed)
+        info_channel = self.get_channel(TOURNAMENT_INFO_ID)
+        await info_channel.send(announcement.mentions, embed=embed)
+        await announcement.delete()
+
+    async def event_deadline(self, document_id):
+        """Open the channels of an event shortly before it starts."""
+        event = await Events.get(document_id)
+        if not event or event.started:
+            return
+        if (
+            datetime.datetime.now()
+            < normalize_deadline(event.schedule_start) - EVENT_LEAD_TIME
+        ):
+            return
+
+        category = await self.guild.create_category(
+            "Event", reason="Event Night start", position=0
+        )
+        text = await category.create_text_channel("Event Chat")
+        voice = await category.create_voice_channel("Event Voicechat")
+        event.category = category.id
+        event.text = text.id
+        event.voice = voice.id
+        event.started = True
+        await event.save()
+        await asyncio.sleep(5)
+        await self.http.modify_guild_scheduled_event(
+            GUILD_ID,
+            event.event_id,
+            channel_id=voice.id,
+            entity_type=2,
+            entity_metadata=None,
+        )
+        await self.http.modify_guild_scheduled_event(
+            GUILD_ID,
+            event.event_id,
+            status=2,
+        )
 
     @staticmethod
     async def on_member_join(member: discord.Member):
@@ -406,19 +471,14 @@ class DoomBot(discord.Client):
         ]:
             return
 
-        entry: Starboard = await Starboard.search(payload.message_id)
-        if entry is None:  # Create a new entry if not already
-            entry = Starboard(
-                message_id=payload.message_id,
-                jump=f"https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}",
-            )
-        elif payload.user_id in entry.reacted:  # Ignore if a user has already reacted.
+        entry = await Starboard.add_star(
+            payload.message_id,
+            payload.user_id,
+            f"https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}",
+        )
+        if entry is None:  # Ignore if a user has already reacted.
             return
 
-        entry.stars += 1
-        entry.reacted = entry.reacted + [payload.user_id]
-        await entry.save()
-
         if entry.stars < 10 and payload.channel_id == SUGGESTIONS_ID:
             return
 
@@ -428,21 +488,24 @@ class DoomBot(discord.Client):
         ]:
             return
 
-        message = (
-            await self.channel_map[payload.channel_id]
-            .get_partial_message(payload.message_id)
-            .fetch()
-        )
-
         if entry.starboard_id != 0:
+            # Only the count changed, so the original message isn't needed.
             starboard_message = self.channel_map_top[
                 payload.channel_id
             ].get_partial_message(entry.starboard_id)
-            await starboard_message.edit(
-                content=f"{star_emoji(entry.stars)} **{entry.stars}** {message.channel.mention}"
+            self.starboard.update(
+                starboard_message,
+                entry.stars,
+                f"{star_emoji(entry.stars)} **{entry.stars}** <#{payload.channel_id}>",
             )
             return
 
+        message = (
+            await self.channel_map[payload.channel_id]
+            .get_partial_message(payload.message_id)
+            .fetch()
+        )
+
         if payload.channel_id == SUGGESTIONS_ID:
             embed = discord.Embed(
                 description=message.content,
@@ -456,8 +519,11 @@ class DoomBot(discord.Client):
                 f"{star_emoji(entry.stars)} **{entry.stars}**",
                 embed=embed,
             )
-            entry.starboard_id = starboard_message.id
-            await entry.save()
+            if not await Starboard.set_starboard_id(
+                payload.message_id, starboard_message.id
+            ):
+                await starboard_message.delete()
+                return
             thread = await starboard_message.create_thread(
                 name=message.content[:100], auto_archive_duration=1440
             )
@@ -486,8 +552,10 @@ class DoomBot(discord.Client):
                 f"{star_emoji(entry.stars)} **{entry.stars}** {message.channel.mention}",
                 embed=embed,
             )
-            entry.starboard_id = starboard_message.id
-            await entry.save()
+            if not await Starboard.set_starboard_id(
+                payload.message_id, starboard_message.id
+            ):
+                await starboard_message.delete()
 
     @staticmethod
     async def on_thread_update(before: discord.Thread, after: discord.Thread):
@@ -2,6 +2,11 @@ import logging
 from os import environ
 
 from database.documents import database_init
+from database.records import (
+    LevelMeta,
+    WorldRecord,
+    check_query_plans,
+)
 from doombot import DoomBot
 from slash import (
     duel,
@@ -16,6 +21,7 @@ from slash import (
     store,
     mods,
 )
+from utils.assets import load_assets
 from utils.utilities import logging_util
 
 logger = logging.getLogger()
@@ -52,6 +58,11 @@ def load_all_extensions():
 async def setup():
     """Upload slash commands to discord."""
     await database_init()
+    await LevelMeta.load()
+    await WorldRecord.rebuild_if_empty()
+    await check_query_plans()
+    await bot.record_autocomplete.load()
+    load_assets()
     await bot.upload_guild_application_commands()
     await bot.upload_global_application_commands()
 
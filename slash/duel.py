@@ -216,6 +216,8 @@ class ForfeitDuel(Slash, guilds=[GUILD_ID], name="forfeit", parent=DuelParent):
             loser = duel.player2.user_id
             winner = duel.player1.user_id
 
+        if not await Duel.claim_payout(duel.id):
+            raise TournamentStateError("This duel has already ended.")
         await ExperiencePoints.duel_end(
             winner=winner,
             loser=loser,
@@ -87,6 +87,7 @@ class CreateEvent(Slash, guilds=[GUILD_ID], name="event"):
             started=False,
         )
         await document.save()
+        self.client.schedule_event(document)
 
         guild = self.client.get_guild(GUILD_ID)
         announcements_channel = guild.get_channel(SERVER_ANNOUNCEMENTS)
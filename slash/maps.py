@@ -126,6 +126,7 @@ class SubmitMap(MapSlash, guilds=[GUILD_ID], parent=SubmitParent, name="map"):
             map_type=view.select_menu.values,
         )
         await submission.insert()
+        self.client.record_autocomplete.add_map(submission)
         await self.interaction.edit_original_message(content=preview, view=view)
 
         new_maps_channel = self.interaction.guild.get_channel(NEWEST_MAPS_ID)
@@ -182,6 +183,7 @@ class DeleteMap(MapSlash, guilds=[GUILD_ID], name="map", parent=DeleteParent):
         view.clear_items()
         preview += f"{'―' * 15}\n" "**__MAP DELETED__** from the database!"
         await map_document.delete()
+        self.client.record_autocomplete.remove_map(map_document.code)
         await self.interaction.edit_original_message(content=preview, view=view)
 
 
@@ -255,6 +257,7 @@ class EditMap(MapSlash, guilds=[GUILD_ID], name="map", parent=EditParent):
             "**__SUBMISSION CONFIRMED__** and submitted to the database!"
         )
         await map_document.save()
+        self.client.record_autocomplete.add_map(map_document)
         await self.interaction.edit_original_message(content=preview, view=view)
 
 
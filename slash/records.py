@@ -5,7 +5,7 @@ import discord
 from discord.utils import MISSING
 
 from database.documents import ExperiencePoints, VerificationViews
-from database.records import Record
+from database.records import Record, WorldRecord
 from slash.parents import DeleteParent, SubmitParent
 from slash.slash_command import RecordSlash, Slash, UserSlash
 from utils.constants import (
@@ -113,7 +113,8 @@ class SubmitRecord(RecordSlash, guilds=[GUILD_ID], name="record", parent=SubmitP
             raise RecordNotFaster("Personal best needs to be faster to update.")
 
         # Create initial document if none found.
-        if not record_document:
+        new_record = not record_document
+        if new_record:
             record_document = Record(
                 user_id=self.interaction.user.id,
                 code=self.map_code,
@@ -147,15 +148,15 @@ class SubmitRecord(RecordSlash, guilds=[GUILD_ID], name="record", parent=SubmitP
 
         if not view.confirm.value:
             return
-        await record_document.save()
-
-        rank = getattr(
-            await Record.find_current_rank(
-                self.map_code, self.map_level, self.interaction.user.id
-            ),
-            "rank",
-            "None",
+        rank = await Record.find_current_rank(
+            self.map_code, self.map_level, record_seconds, self.interaction.user.id
         )
+        await record_document.save()
+        if new_record:
+            self.client.record_autocomplete.add_record(self.map_code, self.map_level)
+        else:
+            # The new time replaced one that may hold the world record.
+            await WorldRecord.recompute(record_document.code, record_document.level_key)
 
         view.clear_items()
         await self.interaction.edit_original_message(
@@ -241,6 +242,11 @@ class DeleteRecord(RecordSlash, guilds=[GUILD_ID], name="record", parent=DeleteP
         await self.interaction.edit_original_message(content="Deleted.", view=view)
         await delete_hidden(self.interaction, record_document)
         await record_document.delete()
+        self.client.record_autocomplete.remove_record(
+            record_document.code, record_document.level
+        )
+        if record_document.verified:
+            await WorldRecord.recompute(record_document.code, record_document.level_key)
 
 
 class ViewRecords(RecordSlash, name="leaderboard"):
@@ -279,9 +285,7 @@ class ViewRecords(RecordSlash, name="leaderboard"):
             embeds = await split_embeds(embed, records, records_board_embed_fields)
 
         else:
-            records = await Record.find_world_records(
-                map_code=self.map_code, verified=True
-            )
+            records = await WorldRecord.find_code(self.map_code)
             embeds = await split_embeds(embed, records, records_wr_embed_fields)
 
         if not records:
@@ -1,19 +1,15 @@
 import io
 from logging import getLogger
 import traceback
-from typing import Dict, List, Union
+from typing import Dict, Union
 
 import discord
 from utils.constants import ERROR_LOGS
 
-from database.documents import Tags
-from database.records import Record
 from utils.errors import DoombotBaseException
 from utils.enums import MapNames, MapTypes
-from utils.utilities import case_ignore_compare
+from utils.search import SearchIndex
 
-MAPS_AUTOCOMPLETE = {k: k for k in MapNames.list()}
-MAP_TYPES_AUTOCOMPLETE = {k: k for k in MapTypes.list()}
 
 logger = getLogger(__name__)
 
@@ -92,28 +88,12 @@ class MapSlash(Slash):
     ) -> discord.AutoCompleteResponse:
         """Display autocomplete for map names and types."""
         if focused == "map_name":
-            if options[focused] == "":
-                return discord.AutoCompleteResponse(
-                    {k: k for k in MapNames.list()[:25]}
-                )
-            response = discord.AutoCompleteResponse(
-                {
-                    k: k
-                    for k in MAPS_AUTOCOMPLETE
-                    if case_ignore_compare(k, options[focused])
-                }
-            )
-            return response
+            suggestions = MapNames.matcher().suggestions(options[focused])
+            return discord.AutoCompleteResponse({k: k for k in suggestions})
 
         if focused == "map_type":
-            response = discord.AutoCompleteResponse(
-                {
-                    k: k
-                    for k in MAP_TYPES_AUTOCOMPLETE
-                    if case_ignore_compare(k, options[focused])
-                }
-            )
-            return response
+            suggestions = MapTypes.matcher().suggestions(options[focused])
+            return discord.AutoCompleteResponse({k: k for k in suggestions})
 
 
 class RecordSlash(Slash):
@@ -124,11 +104,11 @@ class RecordSlash(Slash):
         if focused == "map_level":
             map_code = options.get("map_code")
             map_code = map_code.upper() if map_code else "NULL"
-            levels = await Record.get_level_names(map_code)
-            return discord.AutoCompleteResponse({k: k for k in levels[:25]})
+            levels = self.client.record_autocomplete.levels(map_code, options[focused])
+            return discord.AutoCompleteResponse({k: k for k in levels})
         if focused == "map_code":
             return discord.AutoCompleteResponse(
-                {k: v for k, v in await Record.get_codes(options[focused])}
+                self.client.record_autocomplete.codes(options[focused])
             )
 
 
@@ -136,32 +116,30 @@ class TagSlash(Slash):
     async def autocomplete(
         self, options: Dict[str, Union[int, float, str]], focused: str
     ) -> discord.AutoCompleteResponse:
-        categories = await Tags.find_all_tag_categories()
-        tag_names = await Tags.find_all_tag_names(options.get("category"))
-        return await tags_autocomplete(options, focused, tag_names or categories)
+        tags = self.client.tags
+        category = options.get("category")
+        if focused == "category" or category not in await tags.categories():
+            return await tags_autocomplete(
+                options, focused, await tags.category_index()
+            )
+        return await tags_autocomplete(
+            options, focused, await tags.name_index(category)
+        )
 
 
 class WorkshopSlash(Slash):
     async def autocomplete(
         self, options: Dict[str, Union[int, float, str]], focused: str
     ) -> discord.AutoCompleteResponse:
-        return await tags_autocomplete(options, focused, self.client.ws_list)
+        return await tags_autocomplete(options, focused, self.client.ws_index)
 
 
 async def tags_autocomplete(
     options: Dict[str, Union[int, float, str]],
     focused: str,
-    list_obj: List,
+    index: SearchIndex,
 ):
-    if options[focused] == "":
-        return discord.AutoCompleteResponse({k: k for k in list_obj[:25]})
-
     if focused in ["name", "search", "category"]:
-
-        count = 0
-        autocomplete_ = {}
-        for k in list_obj:
-            if case_ignore_compare(k, options[focused]) and count < 25:
-                autocomplete_[k] = k
-                count += 1
-        return discord.AutoCompleteResponse(autocomplete_)
+        return discord.AutoCompleteResponse(
+            {k: k for k in index.search(options[focused])}
+        )
@@ -75,6 +75,7 @@ class DeleteTag(TagSlash, guilds=[GUILD_ID], name="tag", parent=DeleteParent):
             f"**{tag.name}** has been deleted.",
         ):
             await tag.delete()
+            self.client.tags.invalidate()
 
 
 class CreateTag(TagSlash, guilds=[GUILD_ID], name="tag", parent=CreateParent):
@@ -107,6 +108,7 @@ class CreateTag(TagSlash, guilds=[GUILD_ID], name="tag", parent=CreateParent):
             f"**{tag.name}** has been added as a new tag.",
         ):
             await tag.save()
+            self.client.tags.invalidate()
 
 
 class TagsCommand(TagSlash, name="tag"):
@@ -121,12 +123,12 @@ class TagsCommand(TagSlash, name="tag"):
             raise IncorrectChannel(
                 f"This command can only be used in the <#{PARKOUR_HELP_ID}> channel."
             )
-        tag = await Tags.find_one(
-            Tags.name == self.name, Tags.category == self.category
-        )
-        content = tag.content.replace("\\n", "\n")
+        content = await self.client.tags.content(self.category, self.name)
+        if content is None:
+            raise SearchNotFound("Tag does not exist.")
+        content = content.replace("\\n", "\n")
         await self.interaction.edit_original_message(
-            content=f"**{tag.name}**\n\n{content}"
+            content=f"**{self.name}**\n\n{content}"
         )
 
 
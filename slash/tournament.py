@@ -2,15 +2,16 @@ import asyncio
 import datetime
 import operator
 import re
+import time
 from logging import getLogger
-from typing import Dict, List, Literal, Optional, Union
+from typing import Dict, Literal, Optional, Union
 
 import dateparser
 import discord
 from discord.utils import MISSING, format_dt
 
 from database.documents import ExperiencePoints
-from database.records import Record
+from database.records import Record, WorldRecord
 from database.tournament import (
     Announcement,
     ShortRecordData,
@@ -18,7 +19,8 @@ from database.tournament import (
     TournamentData,
     TournamentMaps,
     TournamentMissions,
-    TournamentRecords,
+    TournamentSnapshot,
+    TournamentSubmission,
 )
 from slash.parents import (
     TournamentMissionsParent,
@@ -60,6 +62,7 @@ from utils.utilities import (
     tournament_category_map,
     tournament_category_map_reverse,
 )
+from utils.xp_engine import ProvisionalXP, compute_tournament_xp, tournament_columns
 from views.basic import ConfirmView
 from views.paginator import Paginator
 from views.tournament import (
@@ -73,23 +76,6 @@ logger = getLogger(__name__)
 
 map_data_regex = re.compile(r"(.+)\s-\s(.+)\s-\s(.+)")
 
-XP_MULTIPLIER = {
-    "ta": 0.14094,
-    "mc": 0.3654,
-    "hc": 0.8352,
-    "bo": 0.3654,
-}
-CATEGORIES = ["ta", "mc", "hc", "bo"]
-
-MISSION_POINTS = {
-    "expert": 2000,
-    "hard": 1500,
-    "medium": 1000,
-    "easy": 500,
-}
-
-MISSION_CATEGORIES = ["expert", "hard", "medium", "easy"]
-
 
 def setup(bot):
     logger.info(logging_util("Loading", "TOURNAMENT"))
@@ -235,6 +221,7 @@ class TournamentStart(
             return
 
         await tournament_document.insert()
+        self.client.schedule_tournament(tournament_document)
         await self.interaction.edit_original_message(
             content="Tournament scheduled.", view=view
         )
@@ -263,15 +250,12 @@ class XPUpdate(
         await self.defer(ephemeral=True)
         await check_permissions(self.interaction)
 
-        user = await ExperiencePoints.find_user(self.player.id)
-        if not user:
+        total = await ExperiencePoints.change_xp(self.player.id, self.xp)
+        if total is None:
             raise UserNotFound("User doesn't exist.")
 
-        user.xp += self.xp
-        await user.save()
-
         await self.interaction.edit_original_message(
-            content=f"XP updated for {self.player.display_name}.\nAdded {self.xp} XP for a total of {user.xp}.",
+            content=f"XP updated for {self.player.display_name}.\nAdded {self.xp} XP for a total of {total}.",
             view=None,
         )
 
@@ -327,6 +311,8 @@ class ChangeRank(
         view = ConfirmView()
         if await view.start(self.interaction, message_content, "Confirmed."):
             await user.save()
+            # Rank changes move records between leaderboard buckets.
+            reset_provisional_xp(self.client)
 
 
 class TournamentDeleteRecordUser(Slash, name="delete-record", parent=TournamentParent):
@@ -382,6 +368,47 @@ class ViewTournamentRecords(Slash, name="leaderboard", parent=TournamentParent):
         await view.start(self.interaction)
 
 
+class TournamentXPPreview(Slash, name="xp-preview", parent=TournamentParent):
+    """View the XP you would earn if the active tournament ended now."""
+
+    user: Optional[discord.Member] = discord.Option(
+        description="Which user do you want to view?"
+    )
+
+    async def callback(self) -> None:
+        await self.defer(ephemeral=True)
+        tournament = await Tournament.find_active()
+        if not tournament:
+            raise TournamentStateError("Tournament not active!")
+        if tournament.bracket:
+            raise TournamentStateError("Bracket tournaments do not award XP.")
+
+        user = self.user if self.user is not MISSING else self.interaction.user
+        standings = (await provisional_xp(self.client, tournament)).standings()
+        row = standings.row(user.id)
+        if not row:
+            raise SearchNotFound(f"{user} hasn't submitted to this tournament!")
+
+        position = int((standings.columns["xp"] > row["xp"]).sum()) + 1
+        description = "".join(
+            f"**{tournament_category_map(category)}:** {round(row[category])}\n"
+            for category in tournament.get_categories()
+        )
+        description += (
+            f"**Missions:** {row['expert']} Expert, {row['hard']} Hard, "
+            f"{row['medium']} Medium, {row['easy']} Easy\n"
+            f"**General:** {row['general']}\n"
+            f"**Total:** {round(row['xp'])} XP "
+            f"({make_ordinal(position)} of {len(standings)})"
+        )
+        embed = create_embed(
+            f"Provisional XP - {user.display_name}",
+            description,
+            self.interaction.user,
+        )
+        await self.interaction.edit_original_message(embed=embed)
+
+
 class TimeAttackSubmission(Slash, name="ta"):
     """Time Attack tournament submission."""
 
@@ -526,6 +553,9 @@ class TournamentAnnouncement(
                 embed=embed.to_dict(), schedule=self.scheduled_start, mentions=mentions
             )
             await document.insert()
+            self.client.scheduler.schedule(
+                "announcement", document.schedule, document.id
+            )
 
             return
 
@@ -586,6 +616,7 @@ class TournamentAddMissions(
             embed=embed,
         ):
             await tournament.save()
+            reset_provisional_xp(self.client)
 
     async def autocomplete(
         self, options: Dict[str, Union[int, float, str]], focused: str
@@ -693,31 +724,15 @@ async def tournament_submissions(
 
     record_seconds = time_convert(record)
 
-    already_posted = False
-    submission = None
-    for r in category_attr.records:
-        if r.user_id == interaction.user.id:
-            if record_seconds >= r.record:
-                raise RecordNotFaster(
-                    "Record must be faster than previously submitted record."
-                )
-            already_posted = True
-            r.record = record_seconds
-            r.attachment_url = screenshot.url
-            submission = r
-            break
-
-    if not already_posted:
-        submission = TournamentRecords(
-            record=record_seconds,
-            user_id=interaction.user.id,
-            attachment_url=screenshot.url,
-        )
-        category_attr.records.append(submission)
+    previous = await TournamentSubmission.find_submission(
+        tournament.tournament_id, category, interaction.user.id
+    )
+    if previous and record_seconds >= previous.record:
+        raise RecordNotFaster("Record must be faster than previously submitted record.")
 
     embed = create_embed(
         f"{tournament_category_map(category)} Submission",
-        f"> **Record:** {display_record(submission.record)}",
+        f"> **Record:** {display_record(record_seconds)}",
         interaction.user,
     )
     embed.set_image(url=screenshot.url)
@@ -729,11 +744,22 @@ async def tournament_submissions(
         "Submitted.",
         embed=embed,
     ):
-        await tournament.save()
+        await TournamentSubmission.submit(
+            tournament.tournament_id,
+            category,
+            interaction.user.id,
+            record_seconds,
+            screenshot.url,
+        )
 
         await interaction.guild.get_channel(TOURNAMENT_SUBMISSION_ID).send(embed=embed)
 
         user = await ExperiencePoints.find_user(interaction.user.id)
+        cached = cached_provisional_xp(interaction.client, tournament)
+        if cached:
+            rank = getattr(user.rank, category) if user else "Unranked"
+            cached.submit(interaction.user.id, category, rank, record_seconds)
+
         if category == "bo":
             return
         if await user.check_if_unranked(category):
@@ -752,32 +778,25 @@ async def end_tournament(client: discord.Client, tournament: Tournament):
     """
     tournament.active = False
     tournament.schedule_end = datetime.datetime(year=1, month=1, day=1)
+    reset_provisional_xp(client)
+    snapshot = await TournamentSnapshot.load(tournament)
     if not tournament.bracket:
-        xp_store = await compute_xp(tournament)
-
-        for user_id, data in xp_store.items():
-            user = await ExperiencePoints.find_user(user_id)
-            user.xp += round(data["xp"])
-
-            for key in user.xp_avg:
-                user.xp_avg[key].pop(0)
-                user.xp_avg[key].append(round(data[key]))
-
-                # Find current average for ending summary
-                usable_user_xps = [xp for xp in user.xp_avg[key] if xp != 0]
-                xp_store[user_id][f"{key}_cur_avg"] = sum(usable_user_xps) / (
-                    len(usable_user_xps) or 1
-                )
-
-            await user.save()
+        xp_store = compute_xp(tournament, snapshot)
+        elapsed = await settle_xp(xp_store, snapshot)
+        logger.info(
+            logging_util(
+                "XP Settled", f"{len(xp_store)} USERS IN {elapsed:.2f} SECONDS"
+            )
+        )
 
         tournament.xp = xp_store
-        await init_workbook(tournament)
+        await init_workbook(tournament, snapshot)
         await client.get_channel(TOURNAMENT_ORG_ID).send(
+            f"XP settled for {len(xp_store)} users in {elapsed:.2f} seconds.",
             file=discord.File(
                 fp=r"DPK_Tournament.xlsx",
                 filename=f"DPK_Tournament_{datetime.datetime.today().strftime('%d-%m-%Y')}.xlsx",
-            )
+            ),
         )
 
         tournament.xp = {str(k): v for k, v in tournament.xp.items()}
@@ -796,15 +815,43 @@ async def end_tournament(client: discord.Client, tournament: Tournament):
     await client.get_channel(TOURNAMENT_INFO_ID).send(tournament.mentions, embed=embed)
 
     # Hall of Fame
-    embed = await create_hall_of_fame(tournament)
+    embed = await create_hall_of_fame(tournament, snapshot)
     hof_msg = await client.get_channel(HALL_OF_FAME_ID).send(embed=embed)
     hof_thread = await hof_msg.create_thread(name="Records Archive")
     # Post export in thread
     await export_records(tournament, hof_thread)
-    await send_records_to_db(tournament)
+    await send_records_to_db(client, tournament, snapshot)
 
 
-async def send_records_to_db(tournament: Tournament):
+async def settle_xp(xp_store: Dict[int, Dict], snapshot: TournamentSnapshot) -> float:
+    """Credit tournament XP and shift each user's XP average window.
+
+    Users come from the snapshot and are written with one bulk write.
+    Return how many seconds settlement took.
+    """
+    start = time.perf_counter()
+    users = [snapshot.users[u] for u in xp_store if u in snapshot.users]
+    totals = {}
+
+    for user in users:
+        data = xp_store[user.user_id]
+        totals[user.user_id] = round(data["xp"])
+
+        for key in user.xp_avg:
+            user.xp_avg[key].pop(0)
+            user.xp_avg[key].append(round(data[key]))
+
+            # Find current average for ending summary
+            usable_user_xps = [xp for xp in user.xp_avg[key] if xp != 0]
+            data[f"{key}_cur_avg"] = sum(usable_user_xps) / (len(usable_user_xps) or 1)
+
+    await ExperiencePoints.bulk_tournament_update(users, totals)
+    return time.perf_counter() - start
+
+
+async def send_records_to_db(
+    client: discord.Client, tournament: Tournament, snapshot: TournamentSnapshot
+):
     """Send tournament records to the standard personal records database collection."""
     for category in ["ta", "mc", "hc", "bo"]:
         data: TournamentData = getattr(tournament, category, None)
@@ -813,9 +860,8 @@ async def send_records_to_db(tournament: Tournament):
         code = data.map_data.code
         level = data.map_data.level
 
-        for record in data.records:
-            user = await ExperiencePoints.find_user(record.user_id)
-            if getattr(user, "dont_submit", None):
+        for record in snapshot.records[category]:
+            if snapshot.dont_submit(record.user_id):
                 continue
             search = await Record.filter_search_single(
                 map_code=code, map_level=level, user_id=record.user_id
@@ -829,6 +875,7 @@ async def send_records_to_db(tournament: Tournament):
                     verified=True,
                     attachment_url=record.attachment_url,
                 )
+                client.record_autocomplete.add_record(code, level)
             else:
                 if search.record <= record.record:
                     continue
@@ -837,6 +884,7 @@ async def send_records_to_db(tournament: Tournament):
                     search.attachment_url = record.attachment_url
                     search.verified = True
             await search.save()
+            await WorldRecord.offer(search)
 
 
 async def export_records(tournament: Tournament, thread: discord.Thread):
@@ -858,7 +906,9 @@ async def export_records(tournament: Tournament, thread: discord.Thread):
             )
             continue
 
-        records = await Tournament.get_records(category)
+        records = await Tournament.get_records(
+            category, tournament_id=tournament.tournament_id
+        )
 
         embed = create_embed(
             title=f"{tournament_category_map(category)}",
@@ -899,24 +949,25 @@ async def start_tournament(client: discord.Client, tournament: Tournament):
     await tournament.save()
 
 
-async def create_hall_of_fame(tournament: Tournament) -> discord.Embed:
+async def create_hall_of_fame(
+    tournament: Tournament, snapshot: TournamentSnapshot
+) -> discord.Embed:
     embed = hall_of_fame(tournament.name + " - Top 3", "")
     for category in ["ta", "mc", "hc", "bo"]:
         data: TournamentData = getattr(tournament, category, None)
         if not data:
             continue
         map_data = data.map_data
-        records = sorted(data.records, key=operator.attrgetter("record"))
+        records = sorted(snapshot.records[category], key=operator.attrgetter("record"))
 
         top_three_list = ""
 
         for pos, record in enumerate(records, start=1):
             if pos > 3:
                 break
-            user = await ExperiencePoints.find_user(record.user_id)
             top_three_list += (
-                f"`{make_ordinal(pos)}` - {user.alias} - {display_record(record.record, tournament=True)} "
-                f"{Emoji.display_rank(getattr(user.rank, category))}\n"
+                f"`{make_ordinal(pos)}` - {snapshot.alias(record.user_id)} - {display_record(record.record, tournament=True)} "
+                f"{Emoji.display_rank(snapshot.rank(record.user_id, category))}\n"
             )
         embed.add_field(
             name=tournament_category_map(category)
@@ -927,225 +978,68 @@ async def create_hall_of_fame(tournament: Tournament) -> discord.Embed:
     return embed
 
 
-async def split_leaderboard_ranks(
-    records: List[Optional[TournamentRecords]], category: str
-) -> Dict[str, List[TournamentRecords]]:
-    """Split leaderboard into individual ranks."""
-
-    sorted_records = sorted(records, key=operator.attrgetter("record"))
+def compute_xp(
+    tournament: Tournament, snapshot: TournamentSnapshot
+) -> Dict[int, Dict[str, Union[int, float]]]:
+    """Compute leaderboard and mission XP for every participant."""
+    return compute_tournament_xp(**tournament_columns(tournament, snapshot)).to_store()
 
-    split_ranks = {
-        "Unranked": [],
-        "Gold": [],
-        "Diamond": [],
-        "Grandmaster": [],
-    }
-    for record in sorted_records:
-        user_ranks = (await ExperiencePoints.find_user(record.user_id)).rank
-        rank = getattr(user_ranks, category)
-        split_ranks[rank].append(record)
-    return split_ranks
 
+def cached_provisional_xp(
+    client: discord.Client, tournament: Tournament
+) -> Optional[ProvisionalXP]:
+    """Provisional XP of the tournament to update in place, if already built.
 
-async def leaderboard_xp(category, split_sorted_records, store):
-    for records in split_sorted_records.values():
-        if not records:
-            continue
-        top_record = records[0].record
-
-        for record in records:
-            if not record:
-                continue
-            xp = await leaderboard_xp_formula(category, record, top_record)
-            store[record.user_id][category] += xp
-            store[record.user_id]["xp"] += xp
-    return store
-
-
-async def leaderboard_xp_formula(category, record, top_record):
-    formula = (
-        1 - (record.record - top_record) / (XP_MULTIPLIER[category] * top_record)
-    ) * 2500
-    if formula < 100:
-        xp = 100
-    else:
-        xp = formula
-    return xp
-
-
-async def init_xp_store(tournament: Tournament) -> Dict[int, Dict[str, int]]:
-    """Initialize the XP dictionary. Fill with all active players."""
-    store = {}
-    for category in ["ta", "mc", "hc", "bo"]:
-        category_attr: TournamentData = getattr(tournament, category, None)
-        if not category_attr:
-            continue
-
-        records = category_attr.records
-
-        for record in records:
-            if not store.get(record.user_id):
-                store[record.user_id] = {
-                    "easy": 0,
-                    "medium": 0,
-                    "hard": 0,
-                    "expert": 0,
-                    "general": 0,
-                    "ta": 0,
-                    "mc": 0,
-                    "hc": 0,
-                    "bo": 0,
-                    "xp": 0,
-                    "ta_cur_avg": 0,
-                    "mc_cur_avg": 0,
-                    "hc_cur_avg": 0,
-                    "bo_cur_avg": 0,
-                }
-    return store
-
-
-async def compute_mission_xp(tournament: Tournament, store: dict) -> Dict[int, Dict]:
-    """Compute the XP from difficulty based missions."""
-
-    for category in CATEGORIES:
-        category_attr: TournamentData = getattr(tournament, category, None)
-        if not category_attr:
-            continue
-        records = category_attr.records
-        missions = category_attr.missions
-        for record in records:
-
-            store = await mission_complete_check(missions, record, store)
-    return store
-
-
-async def mission_complete_check(missions, record, store: dict) -> dict:
-    # Goes hardest to easiest, because highest mission only
-    for mission_category in MISSION_CATEGORIES:
-
-        mission: TournamentMissions = getattr(missions, mission_category, None)
-        if not mission:
-            continue
-
-        type_ = mission.type
-        target = mission.target
-
-        if (type_ == "sub" and record.record < float(target)) or (
-            type_ == "complete" and record.record
-        ):
-            store[record.user_id][mission_category] += 1
-            store[record.user_id]["xp"] += MISSION_POINTS[mission_category]
-            break
-    return store
-
-
-async def compute_general_missions(
-    tournament: Tournament,
-    store: Dict[int, Dict],
-    all_records: Dict[str, Dict[str, List[TournamentRecords]]],
-) -> Dict[int, Dict]:
-    general_missions = tournament.general
-
-    for user_id, data in store.items():
-        for mission in general_missions:
-
-            if mission.type == "xp" and data["xp"] > int(mission.target):
-                store[user_id]["general"] += 1
-                store[user_id]["xp"] += 2000
-
-            if mission.type == "missions":
-                store = await general_mission_missions(mission, user_id, data, store)
-
-            if mission.type == "top":
-                store = await gen_mission_top(all_records, mission, store, user_id)
-    return store
-
-
-async def gen_mission_top(all_records, mission, store, user_id):
-    temp_store = {
-        "ta": 0,
-        "mc": 0,
-        "hc": 0,
-        "bo": 0,
-    }
-    for category in ["ta", "mc", "hc", "bo"]:
-        record_category = all_records.get(category, None)
-        if not record_category:
-            continue
-        for _, rank_records in record_category.items():
-            if not rank_records:
-                continue
-            for i, record in enumerate(rank_records):
-                if i > 2:
-                    break
-                if record.user_id == user_id:
-                    temp_store[category] += 1
-                    break
-    if sum(temp_store.values()) >= int(mission.target):
-        store[user_id]["general"] += 1
-        store[user_id]["xp"] += 2000
-
-    return store
-
-
-async def compute_xp(tournament: Tournament):
-    store = await init_xp_store(tournament)
-    all_records = {}
-
-    # Leaderboard
-    for category in CATEGORIES:
-        records = getattr(getattr(tournament, category, None), "records", None)
-        if not records:
-            continue
-
-        sorted_records = await split_leaderboard_ranks(records, category)
-        all_records[category] = sorted_records
-        store = await leaderboard_xp(category, sorted_records, store)
-
-    # Difficulty Missions
-    store = await compute_mission_xp(tournament, store)
-
-    # General Missions
-    store = await compute_general_missions(tournament, store, all_records)
-
-    return store
+    Called after a submission is written or deleted. A build still loading
+    its snapshot may have missed that write, so it is marked stale too.
+    """
+    client.provisional_xp_version += 1
+    cached: Optional[ProvisionalXP] = client.provisional_xp
+    if cached and cached.tournament_id == tournament.tournament_id:
+        return cached
+    return None
 
 
-async def general_mission_missions(mission, user_id, data, store):
-    split = mission.target.split()
-    if len(split) != 2:
-        return store
+def reset_provisional_xp(client: discord.Client):
+    """Drop the provisional XP and any build in progress."""
+    client.provisional_xp = None
+    client.provisional_xp_version += 1
 
-    target_amt = int(split[0])
-    target_difficulty = split[1].lower()
 
-    encompass_missions = {
-        "easy": data["easy"] + data["medium"] + data["hard"] + data["expert"],
-        "medium": data["medium"] + data["hard"] + data["expert"],
-        "hard": data["hard"] + data["expert"],
-        "expert": data["expert"],
-    }
+async def provisional_xp(
+    client: discord.Client, tournament: Tournament
+) -> ProvisionalXP:
+    """Provisional XP of the active tournament, built once and kept on the client.
 
-    if encompass_missions[target_difficulty] >= target_amt:
-        store[user_id]["general"] += 1
-        store[user_id]["xp"] += 2000
+    Submissions and deletions update it in place. Anything that changes ranks
+    or missions resets it, and the next read rebuilds it. A build that any of
+    those overlapped is returned but not kept.
+    """
+    cached: Optional[ProvisionalXP] = client.provisional_xp
+    if cached and cached.tournament_id == tournament.tournament_id:
+        return cached
+    version = client.provisional_xp_version
+    snapshot = await TournamentSnapshot.load(tournament)
+    built = ProvisionalXP.from_columns(
+        tournament.tournament_id, **tournament_columns(tournament, snapshot)
+    )
+    if client.provisional_xp_version == version:
+        client.provisional_xp = built
+    return built
 
 
 async def delete_record(interaction: discord.Interaction, category, user):
     tournament = await Tournament.find_active()
     if not tournament:
         raise TournamentStateError("Tournament not active!")
-    category_attr = getattr(tournament, tournament_category_map_reverse(category))
+    category_abbr = tournament_category_map_reverse(category)
+    category_attr = getattr(tournament, category_abbr)
     if not category_attr:
         raise TournamentStateError("This category is not active.")
-    records: List[Optional[TournamentRecords]] = category_attr.records
-
-    for i, record in enumerate(records):
-        if record.user_id == user.id:
-            user_record = record
-            del records[i]
-            break
-    else:
+    user_record = await TournamentSubmission.find_submission(
+        tournament.tournament_id, category_abbr, user.id
+    )
+    if not user_record:
         raise UserNotFound("You haven't submitted to this category!")
 
     message_content = (
@@ -1155,4 +1049,7 @@ async def delete_record(interaction: discord.Interaction, category, user):
     message_content += "\nIs this correct?"
     view = ConfirmView()
     if await view.start(interaction, message_content, "Confirmed."):
-        await tournament.save()
+        await user_record.delete()
+        cached = cached_provisional_xp(interaction.client, tournament)
+        if cached:
+            cached.remove(user.id, category_abbr)
@@ -0,0 +1,59 @@
+import asyncio
+import datetime
+
+from utils.scheduler import Scheduler
+
+
+def run_due(register, keys, wait=0.2):
+    """Schedule every key as due now and return whether the runner is still up."""
+
+    async def main():
+        scheduler = Scheduler()
+        register(scheduler)
+        scheduler.start()
+        now = datetime.datetime.now()
+        for key in keys:
+            scheduler.schedule("job", now, key)
+        await asyncio.sleep(wait)
+        return scheduler.is_running()
+
+    return asyncio.run(main())
+
+
+def shared_counter():
+    """Handler with a read, await, write on state shared by every key."""
+    state = {"value": 0, "running": 0, "overlapped": False}
+
+    async def handler(_):
+        state["running"] += 1
+        state["overlapped"] |= state["running"] > 1
+        value = state["value"]
+        await asyncio.sleep(0.01)
+        state["value"] = value + 1
+        state["running"] -= 1
+
+    return state, handler
+
+
+def test_serialized_kind_runs_keys_in_order():
+    state, handler = shared_counter()
+    run_due(lambda s: s.register("job", handler, serialized=True), [1, 2, 3])
+    assert state == {"value": 3, "running": 0, "overlapped": False}
+
+
+def test_unserialized_keys_run_concurrently():
+    state, handler = shared_counter()
+    run_due(lambda s: s.register("job", handler), [1, 2])
+    assert state["overlapped"]
+
+
+def test_failing_job_does_not_stop_runner():
+    ran = []
+
+    async def handler(key):
+        if key == 1:
+            raise ValueError(key)
+        ran.append(key)
+
+    assert run_due(lambda s: s.register("job", handler), [1, 2])
+    assert ran == [2]
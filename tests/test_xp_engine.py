@@ -0,0 +1,449 @@
+"""Golden tests for the tournament XP engine.
+
+The expected XP stores come from the per user implementation the engine
+replaced (compute_xp, leaderboard_xp_formula, mission_complete_check and
+gen_mission_top in slash/tournament.py), kept here as the reference.
+ProvisionalXP is checked against the engine after every update.
+"""
+import operator
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from utils.xp_engine import (
+    CATEGORIES,
+    MISSION_CATEGORIES,
+    MISSION_POINTS,
+    RANKS,
+    ProvisionalXP,
+    XP_MULTIPLIER,
+    compute_tournament_xp,
+    tournament_columns,
+)
+
+
+# Reference implementation
+
+
+def split_leaderboard_ranks(records, category, users):
+    sorted_records = sorted(records, key=operator.attrgetter("record"))
+    split_ranks = {rank: [] for rank in RANKS}
+    for record in sorted_records:
+        split_ranks[user_rank(users, record.user_id, category)].append(record)
+    return split_ranks
+
+
+def user_rank(users, user_id, category):
+    user = users.get(user_id)
+    if user:
+        return getattr(user.rank, category)
+    return "Unranked"
+
+
+def leaderboard_xp(category, split_sorted_records, store):
+    for records in split_sorted_records.values():
+        if not records:
+            continue
+        top_record = records[0].record
+
+        for record in records:
+            if not record:
+                continue
+            xp = leaderboard_xp_formula(category, record, top_record)
+            store[record.user_id][category] += xp
+            store[record.user_id]["xp"] += xp
+    return store
+
+
+def leaderboard_xp_formula(category, record, top_record):
+    formula = (
+        1 - (record.record - top_record) / (XP_MULTIPLIER[category] * top_record)
+    ) * 2500
+    if formula < 100:
+        xp = 100
+    else:
+        xp = formula
+    return xp
+
+
+def init_xp_store(records):
+    store = {}
+    for category in CATEGORIES:
+        for record in records.get(category) or []:
+            if not store.get(record.user_id):
+                store[record.user_id] = {
+                    "easy": 0,
+                    "medium": 0,
+                    "hard": 0,
+                    "expert": 0,
+                    "general": 0,
+                    "ta": 0,
+                    "mc": 0,
+                    "hc": 0,
+                    "bo": 0,
+                    "xp": 0,
+                    "ta_cur_avg": 0,
+                    "mc_cur_avg": 0,
+                    "hc_cur_avg": 0,
+                    "bo_cur_avg": 0,
+                }
+    return store
+
+
+def compute_mission_xp(tournament, records, store):
+    for category in CATEGORIES:
+        category_attr = getattr(tournament, category, None)
+        if not category_attr:
+            continue
+        for record in records[category]:
+            store = mission_complete_check(category_attr.missions, record, store)
+    return store
+
+
+def mission_complete_check(missions, record, store):
+    for mission_category in MISSION_CATEGORIES:
+        mission = getattr(missions, mission_category, None)
+        if not mission:
+            continue
+
+        type_ = mission.type
+        target = mission.target
+
+        if (type_ == "sub" and record.record < float(target)) or (
+            type_ == "complete" and record.record
+        ):
+            store[record.user_id][mission_category] += 1
+            store[record.user_id]["xp"] += MISSION_POINTS[mission_category]
+            break
+    return store
+
+
+def compute_general_missions(tournament, store, all_records):
+    for user_id, data in store.items():
+        for mission in tournament.general:
+            if mission.type == "xp" and data["xp"] > int(mission.target):
+                store[user_id]["general"] += 1
+                store[user_id]["xp"] += 2000
+
+            if mission.type == "missions":
+                store = general_mission_missions(mission, user_id, data, store)
+
+            if mission.type == "top":
+                store = gen_mission_top(all_records, mission, store, user_id)
+    return store
+
+
+def gen_mission_top(all_records, mission, store, user_id):
+    temp_store = {category: 0 for category in CATEGORIES}
+    for category in CATEGORIES:
+        record_category = all_records.get(category, None)
+        if not record_category:
+            continue
+        for _, rank_records in record_category.items():
+            if not rank_records:
+                continue
+            for i, record in enumerate(rank_records):
+                if i > 2:
+                    break
+                if record.user_id == user_id:
+                    temp_store[category] += 1
+                    break
+    if sum(temp_store.values()) >= int(mission.target):
+        store[user_id]["general"] += 1
+        store[user_id]["xp"] += 2000
+
+    return store
+
+
+def general_mission_missions(mission, user_id, data, store):
+    split = mission.target.split()
+    if len(split) != 2:
+        return store
+
+    target_amt = int(split[0])
+    target_difficulty = split[1].lower()
+
+    encompass_missions = {
+        "easy": data["easy"] + data["medium"] + data["hard"] + data["expert"],
+        "medium": data["medium"] + data["hard"] + data["expert"],
+        "hard": data["hard"] + data["expert"],
+        "expert": data["expert"],
+    }
+
+    if encompass_missions[target_difficulty] >= target_amt:
+        store[user_id]["general"] += 1
+        store[user_id]["xp"] += 2000
+    # The original fell through and returned None, replacing the whole store.
+    return store
+
+
+def compute_xp(tournament, records, users):
+    store = init_xp_store(records)
+    all_records = {}
+
+    for category in CATEGORIES:
+        category_records = records.get(category)
+        if not category_records:
+            continue
+        sorted_records = split_leaderboard_ranks(category_records, category, users)
+        all_records[category] = sorted_records
+        store = leaderboard_xp(category, sorted_records, store)
+
+    store = compute_mission_xp(tournament, records, store)
+    return compute_general_missions(tournament, store, all_records)
+
+
+# Fixtures
+
+
+def mission(type_=None, target=None):
+    return SimpleNamespace(type=type_, target=target)
+
+
+def category_data(**missions):
+    return SimpleNamespace(
+        missions=SimpleNamespace(
+            **{
+                difficulty: missions.get(difficulty, mission())
+                for difficulty in MISSION_CATEGORIES
+            }
+        )
+    )
+
+
+def user(ta="Unranked", mc="Unranked", hc="Unranked", bo="Unranked", dont_submit=False):
+    return SimpleNamespace(
+        rank=SimpleNamespace(ta=ta, mc=mc, hc=hc, bo=bo), dont_submit=dont_submit
+    )
+
+
+def record(user_id, time):
+    return SimpleNamespace(user_id=user_id, record=time)
+
+
+def engine_columns(tournament, records, users):
+    """Engine input built through a stand in for TournamentSnapshot."""
+    snapshot = SimpleNamespace(
+        records=records,
+        rank=lambda user_id, category: user_rank(users, user_id, category),
+    )
+    return tournament_columns(tournament, snapshot)
+
+
+def mixed_tournament():
+    """Every category, all ranks, ties, every mission type and opted out users."""
+    users = {
+        1: user(ta="Gold", mc="Diamond", hc="Grandmaster", bo="Gold"),
+        2: user(ta="Gold", mc="Diamond", dont_submit=True),
+        3: user(ta="Grandmaster", mc="Unranked", hc="Grandmaster"),
+        4: user(dont_submit=True),
+        5: user(ta="Gold", hc="Diamond", bo="Diamond"),
+        6: user(ta="Gold", mc="Diamond", hc="Diamond", bo="Diamond"),
+        # 7 has no user document and counts as Unranked everywhere.
+    }
+    tournament = SimpleNamespace(
+        ta=category_data(
+            expert=mission("sub", "30.5"),
+            hard=mission("sub", "35"),
+            easy=mission("complete"),
+        ),
+        mc=category_data(medium=mission("sub", "60")),
+        hc=category_data(
+            expert=mission("sub", "100"), medium=mission("complete", None)
+        ),
+        bo=category_data(),
+        general=[
+            mission("xp", "4000"),
+            mission("missions", "2 easy"),
+            mission("top", "2"),
+            mission("missions", "1 expert"),
+            mission("missions", "malformed"),
+        ],
+    )
+    records = {
+        "ta": [
+            record(1, 31.0),
+            record(2, 31.0),  # tie with 1, submitted later
+            record(5, 29.75),
+            record(6, 40.2),
+            record(4, 33.0),
+            record(3, 28.1),
+            record(7, 50.0),
+        ],
+        "mc": [
+            record(2, 55.5),
+            record(1, 55.5),
+            record(6, 61.0),
+            record(3, 70.0),
+            record(4, 59.9),
+        ],
+        "hc": [
+            record(3, 99.9),
+            record(1, 120.0),
+            record(5, 400.0),  # far enough behind to hit the 100 XP floor
+            record(6, 101.0),
+        ],
+        "bo": [
+            record(5, 12.0),
+            record(6, 12.0),
+            record(1, 15.0),
+        ],
+    }
+    return tournament, records, users
+
+
+def single_category_tournament():
+    """Only time attack is active, with more than three players per rank."""
+    users = {user_id: user(ta="Diamond") for user_id in range(10, 16)}
+    tournament = SimpleNamespace(
+        ta=category_data(easy=mission("complete")),
+        mc=None,
+        hc=None,
+        bo=None,
+        general=[mission("top", "1"), mission("xp", "2500")],
+    )
+    records = {
+        "ta": [record(user_id, 20.0 + (user_id % 3)) for user_id in range(10, 16)],
+    }
+    return tournament, records, users
+
+
+def random_tournament(seed):
+    rng = random.Random(seed)
+    user_ids = list(range(100, 100 + rng.randint(1, 40)))
+    users = {
+        user_id: user(
+            **{category: rng.choice(RANKS) for category in CATEGORIES},
+            dont_submit=rng.random() < 0.3,
+        )
+        for user_id in user_ids
+        if rng.random() < 0.9
+    }
+
+    def random_mission():
+        roll = rng.random()
+        if roll < 0.4:
+            return mission("sub", str(rng.choice([20, 25.5, 30, 45])))
+        if roll < 0.6:
+            return mission("complete")
+        return mission()
+
+    active = [category for category in CATEGORIES if rng.random() < 0.8] or ["ta"]
+    tournament = SimpleNamespace(
+        **{
+            category: category_data(
+                **{difficulty: random_mission() for difficulty in MISSION_CATEGORIES}
+            )
+            if category in active
+            else None
+            for category in CATEGORIES
+        },
+        general=[
+            rng.choice(
+                [
+                    mission("xp", str(rng.randint(1000, 8000))),
+                    mission(
+                        "missions",
+                        f"{rng.randint(1, 3)} {rng.choice(MISSION_CATEGORIES)}",
+                    ),
+                    mission("top", str(rng.randint(1, 3))),
+                ]
+            )
+            for _ in range(rng.randint(0, 4))
+        ],
+    )
+    records = {
+        category: [
+            # Coarse times so ties are common.
+            record(user_id, rng.randint(30, 120) / 2)
+            for user_id in rng.sample(user_ids, rng.randint(1, len(user_ids)))
+        ]
+        for category in active
+    }
+    return tournament, records, users
+
+
+TOURNAMENTS = [mixed_tournament(), single_category_tournament()] + [
+    random_tournament(seed) for seed in range(50)
+]
+
+
+@pytest.mark.parametrize("tournament, records, users", TOURNAMENTS)
+def test_engine_matches_reference(tournament, records, users):
+    expected = compute_xp(tournament, records, users)
+    actual = compute_tournament_xp(**engine_columns(tournament, records, users))
+    assert actual.to_store() == expected
+    # Users are listed in order of their first submission, like the old store.
+    assert list(actual.to_store()) == list(expected)
+
+
+def test_dont_submit_does_not_change_xp():
+    tournament, records, users = mixed_tournament()
+    expected = compute_tournament_xp(
+        **engine_columns(tournament, records, users)
+    ).to_store()
+    for u in users.values():
+        u.dont_submit = not u.dont_submit
+    actual = compute_tournament_xp(**engine_columns(tournament, records, users))
+    assert actual.to_store() == expected
+
+
+def test_mixed_tournament_covers_missions():
+    """Sanity check that the fixture reaches every mission branch."""
+    tournament, records, users = mixed_tournament()
+    store = compute_xp(tournament, records, users)
+    for column in ["easy", "medium", "expert", "general"]:
+        assert any(row[column] for row in store.values()), column
+    assert any(row["hc"] == 100 for row in store.values())
+
+
+def provisional_matches_engine(provisional, tournament, records, users):
+    expected = compute_tournament_xp(
+        **engine_columns(tournament, records, users)
+    ).to_store()
+    actual = provisional.standings().to_store()
+    assert actual == {user_id: pytest.approx(row) for user_id, row in expected.items()}
+
+
+@pytest.mark.parametrize("tournament, records, users", TOURNAMENTS)
+def test_provisional_submissions_match_engine(tournament, records, users):
+    columns = engine_columns(tournament, records, users)
+    provisional = ProvisionalXP(1, columns["missions"], columns["general"])
+    submitted = {category: [] for category in records}
+    for category in CATEGORIES:
+        for r in records.get(category) or []:
+            provisional.submit(
+                r.user_id, category, user_rank(users, r.user_id, category), r.record
+            )
+            submitted[category].append(r)
+            provisional_matches_engine(provisional, tournament, submitted, users)
+    assert list(provisional.standings().to_store()) == list(
+        compute_tournament_xp(**columns).to_store()
+    )
+
+
+def test_provisional_resubmit_rank_change_and_remove():
+    tournament, records, users = mixed_tournament()
+    provisional = ProvisionalXP.from_columns(
+        1, **engine_columns(tournament, records, users)
+    )
+    provisional_matches_engine(provisional, tournament, records, users)
+
+    # A faster time replaces the record where it was first submitted.
+    records["ta"][5] = record(3, 27.0)
+    provisional.submit(3, "ta", "Grandmaster", 27.0)
+    provisional_matches_engine(provisional, tournament, records, users)
+
+    # Moving rank takes the record out of its old bucket.
+    users[6].rank.ta = "Grandmaster"
+    provisional.submit(6, "ta", "Grandmaster", 40.2)
+    provisional_matches_engine(provisional, tournament, records, users)
+
+    del records["hc"][0]
+    provisional.remove(3, "hc")
+    provisional_matches_engine(provisional, tournament, records, users)
+
+    records["bo"] = [r for r in records["bo"] if r.user_id != 1]
+    provisional.remove(1, "bo")
+    provisional_matches_engine(provisional, tournament, records, users)
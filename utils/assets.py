@@ -0,0 +1,99 @@
+from functools import lru_cache
+from logging import getLogger
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple
+
+from PIL import Image, ImageFont
+
+from utils.utilities import logging_util
+
+logger = getLogger(__name__)
+
+ASSETS_DIR = Path("data")
+
+# Rank cards are sent at half the size of their artwork, so images and fonts
+# are scaled down once here rather than on every render.
+ASSET_SCALE = 2
+
+# Every size each font is drawn at on the rank card, at artwork scale.
+FONT_SIZES = {
+    "avenir.otf": (50,),
+    "segoeui.ttf": (30, 40, 85, 100, 110, 120),
+}
+
+RANK_LOGOS = {
+    "Unranked": "ranks/bronze.png",
+    "Gold": "ranks/gold.png",
+    "Diamond": "ranks/diamond.png",
+    "Grandmaster": "ranks/grandmaster.png",
+}
+RANK_LOGO_SIZE = (100 // ASSET_SCALE, 100 // ASSET_SCALE)
+
+
+class AssetRegistry:
+    """Decoded images and parsed fonts under the data directory.
+
+    Images are RGBA, scaled down by ASSET_SCALE and shared between renders,
+    so they must only be pasted from and never drawn on. Fonts are looked up
+    by their artwork size and come back scaled the same way.
+    """
+
+    def __init__(
+        self,
+        images: Dict[str, Image.Image],
+        fonts: Dict[Tuple[str, int], ImageFont.FreeTypeFont],
+    ):
+        self._images: Mapping[str, Image.Image] = MappingProxyType(images)
+        self._fonts: Mapping[
+            Tuple[str, int], ImageFont.FreeTypeFont
+        ] = MappingProxyType(fonts)
+        self._logos: Mapping[str, Image.Image] = MappingProxyType(
+            {rank: self._thumbnail(path) for rank, path in RANK_LOGOS.items()}
+        )
+
+    @classmethod
+    def from_directory(cls, root: Path = ASSETS_DIR) -> "AssetRegistry":
+        images = {}
+        for path in sorted(root.rglob("*.png")):
+            with Image.open(path) as image:
+                width, height = image.size
+                images[path.relative_to(root).as_posix()] = image.convert(
+                    "RGBA"
+                ).resize((width // ASSET_SCALE, height // ASSET_SCALE), Image.LANCZOS)
+        fonts = {
+            (name, size): ImageFont.truetype(
+                str(root / "fonts" / name), size // ASSET_SCALE
+            )
+            for name, sizes in FONT_SIZES.items()
+            for size in sizes
+        }
+        logger.info(
+            logging_util("Assets Loaded", f"{len(images)} IMAGES, {len(fonts)} FONTS")
+        )
+        return cls(images, fonts)
+
+    def image(self, path: str) -> Image.Image:
+        """Image at a path relative to the data directory."""
+        return self._images[path]
+
+    def portrait(self, filename: str) -> Image.Image:
+        return self._images["portraits/" + filename]
+
+    def logo(self, rank: str) -> Image.Image:
+        """Rank logo, already scaled to fit the rank card."""
+        return self._logos[rank]
+
+    def font(self, name: str, size: int) -> ImageFont.FreeTypeFont:
+        return self._fonts[(name, size)]
+
+    def _thumbnail(self, path: str) -> Image.Image:
+        logo = self._images[path].copy()
+        logo.thumbnail(RANK_LOGO_SIZE)
+        return logo
+
+
+@lru_cache(maxsize=None)
+def load_assets() -> AssetRegistry:
+    """The asset registry of this process, loaded on first use."""
+    return AssetRegistry.from_directory()
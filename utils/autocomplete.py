@@ -0,0 +1,107 @@
+import bisect
+from collections import Counter
+from logging import getLogger
+from typing import Dict, List, Optional, Tuple
+
+from database.maps import Map
+from database.records import Record
+from utils.utilities import logging_util, preprocess_map_code
+
+logger = getLogger(__name__)
+
+# Discord shows at most 25 autocomplete choices.
+AUTOCOMPLETE_LIMIT = 25
+
+
+class RecordAutocomplete:
+    """Prefix index of record map codes and their level names.
+
+    Built once at startup and updated as records and maps are added or
+    removed, so autocomplete is answered without a database call.
+    """
+
+    def __init__(self):
+        self._codes: List[str] = []
+        self._levels: Dict[str, Counter] = {}
+        self._sorted_levels: Dict[str, List[str]] = {}
+        self._maps: Dict[str, Tuple[str, str]] = {}
+
+    async def load(self):
+        """Build the index from the Record and Map collections."""
+        self._levels = {}
+        self._sorted_levels = {}
+        self._maps = {}
+        levels = Record.get_motor_collection().aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": {"code": "$code", "level": "$level"},
+                        "count": {"$sum": 1},
+                    }
+                }
+            ]
+        )
+        async for level in levels:
+            self._levels.setdefault(level["_id"]["code"], Counter())[
+                level["_id"]["level"]
+            ] = level["count"]
+        self._codes = sorted(self._levels)
+
+        for map_ in await Map.find().to_list():
+            self.add_map(map_)
+        logger.info(
+            logging_util("Autocomplete Loaded", f"{len(self._codes)} MAP CODES")
+        )
+
+    def add_record(self, code: str, level: str):
+        if code not in self._levels:
+            bisect.insort(self._codes, code)
+            self._levels[code] = Counter()
+        self._levels[code][level] += 1
+        self._sorted_levels.pop(code, None)
+
+    def remove_record(self, code: str, level: str):
+        levels = self._levels.get(code)
+        if not levels or not levels[level]:
+            return
+        levels[level] -= 1
+        if not levels[level]:
+            del levels[level]
+            self._sorted_levels.pop(code, None)
+        if not levels:
+            del self._levels[code]
+            self._codes.remove(code)
+
+    def add_map(self, map_: Map):
+        self._maps[map_.code] = (map_.map_name, map_.creator)
+
+    def remove_map(self, code: str):
+        self._maps.pop(code, None)
+
+    def codes(self, prefix: str) -> Dict[str, str]:
+        """Codes starting with a prefix, labelled with map name and creator."""
+        prefix = preprocess_map_code(prefix)
+        start = bisect.bisect_left(self._codes, prefix)
+        choices = {}
+        for code in self._codes[start : start + AUTOCOMPLETE_LIMIT]:
+            if not code.startswith(prefix):
+                break
+            choices[self._label(code)] = code
+        return choices
+
+    def levels(self, code: str, prefix: str = "") -> List[str]:
+        """Level names of a code starting with a prefix, ignoring case."""
+        levels = self._sorted_levels.get(code)
+        if levels is None:
+            levels = sorted(self._levels.get(code, ()))
+            self._sorted_levels[code] = levels
+        prefix = prefix.casefold()
+        return [level for level in levels if level.casefold().startswith(prefix)][
+            :AUTOCOMPLETE_LIMIT
+        ]
+
+    def _label(self, code: str) -> str:
+        map_data: Optional[Tuple[str, str]] = self._maps.get(code)
+        if map_data:
+            return f"{code} -- ({map_data[0]} by {map_data[1]})"
+        return code
@@ -5,7 +5,7 @@ from discord.utils import MISSING
 
 from database.documents import ExperiencePoints, XPOnly
 from database.maps import Map
-from database.records import Record, WorldRecordsAggregate
+from database.records import Record, WorldRecord, display_level_record
 from database.tournament import TournamentRecordsLookup
 from utils.enums import Emoji
 from utils.utilities import display_record
@@ -94,7 +94,7 @@ async def records_board_embed_fields(r: Record, count: int, *args, **kwargs) ->
     return {
         "name": f"#{count + 1} - {await ExperiencePoints.get_alias(r.user_id)}",
         "value": (
-            f"> **Record**: {display_record(r.record)}\n"
+            f"> **Record**: {display_level_record(r.code, r.level_key, r.record)}\n"
             f"> **Verified**: {Emoji.is_verified(r.verified)}\n"
             f'> [Image Link]({r.attachment_url} "Link to the original submission image.")'
         ),
@@ -108,7 +108,7 @@ async def records_basic_embed_fields(r: Record, *args, **kwargs) -> dict:
         "value": (
             f"> **Map Code:** {r.code}\n"
             f"> **Level name:** {discord.utils.escape_markdown(r.level)}\n"
-            f"> **Record:** {display_record(r.record)}\n"
+            f"> **Record:** {display_level_record(r.code, r.level_key, r.record)}\n"
             f'> [Image Link]({r.attachment_url} "Link to the original submission image.")'
         ),
     }
@@ -121,32 +121,32 @@ async def records_basic_embed_fields_verification(r: Record, *args, **kwargs) ->
         "value": (
             f"> **Map Code:** {r.code}\n"
             f"> **Level name:** {discord.utils.escape_markdown(r.level)}\n"
-            f"> **Record:** {display_record(r.record)}\n"
+            f"> **Record:** {display_level_record(r.code, r.level_key, r.record)}\n"
             f"> **Verified**: {Emoji.is_verified(r.verified)}\n"
             f'> [Image Link]({r.attachment_url} "Link to the original submission image.")'
         ),
     }
 
 
-async def records_wr_embed_fields(r: Record, *args, **kwargs) -> dict:
+async def records_wr_embed_fields(r: WorldRecord, *args, **kwargs) -> dict:
     """Embed fields for world records among multiple levels."""
     return {
-        "name": f"{discord.utils.escape_markdown(r.id.level)} - {await ExperiencePoints.get_alias(r.user_id)}",
+        "name": f"{discord.utils.escape_markdown(r.level)} - {await ExperiencePoints.get_alias(r.user_id)}",
         "value": (
-            f"> **Record**: {display_record(r.record)}\n"
+            f"> **Record**: {display_level_record(r.code, r.level_key, r.record)}\n"
             f'> [Image Link]({r.url} "Link to the original submission image.")'
         ),
     }
 
 
-async def records_wr_user_embed_fields(r: Record, *args, **kwargs) -> dict:
+async def records_wr_user_embed_fields(r: WorldRecord, *args, **kwargs) -> dict:
     """Embed fields for world records among multiple levels."""
     return {
         "name": (
-            f"{r.id.code} - {discord.utils.escape_markdown(r.id.level)} - {await ExperiencePoints.get_alias(r.user_id)}"
+            f"{r.code} - {discord.utils.escape_markdown(r.level)} - {await ExperiencePoints.get_alias(r.user_id)}"
         ),
         "value": (
-            f"> **Record**: {display_record(r.record)}\n"
+            f"> **Record**: {display_level_record(r.code, r.level_key, r.record)}\n"
             f'> [Image Link]({r.url} "Link to the original submission image.")'
         ),
     }
@@ -154,7 +154,7 @@ async def records_wr_user_embed_fields(r: Record, *args, **kwargs) -> dict:
 
 async def split_embeds(
     initial_embed: discord.Embed,
-    documents: List[Union[Map, Record, WorldRecordsAggregate, TournamentRecordsLookup]],
+    documents: List[Union[Map, Record, WorldRecord, TournamentRecordsLookup]],
     field_opts,
     category=None,
     rank=None,
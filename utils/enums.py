@@ -1,7 +1,9 @@
 from enum import Enum
-from operator import itemgetter
+from typing import Dict
 
-from thefuzz import fuzz
+from utils.fuzzy import FuzzyMatcher
+
+_MATCHERS: Dict[type, FuzzyMatcher] = {}
 
 
 class ExtendedEnum(Enum):
@@ -16,14 +18,17 @@ class ExtendedEnum(Enum):
         """List of all values in the cls."""
         return sorted(list(map(lambda c: c.value, cls)))
 
+    @classmethod
+    def matcher(cls) -> FuzzyMatcher:
+        """Shared fuzzy matcher over the values of the cls."""
+        if cls not in _MATCHERS:
+            _MATCHERS[cls] = FuzzyMatcher(member.value for member in cls)
+        return _MATCHERS[cls]
+
     @classmethod
     def fuzz(cls, value):
         """Fuzz a value."""
-        values = [
-            (member, fuzz.partial_ratio(value, member.value))
-            for name, member in cls.__members__.items()
-        ]
-        return str(max(values, key=itemgetter(1))[0])
+        return cls.matcher().best(value)
 
 
 class MapNames(ExtendedEnum):
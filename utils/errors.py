@@ -52,3 +52,7 @@ class NameTooLong(DoombotBaseException):
 
 class UserNotFound(DoombotBaseException):
     """User hasn't submitted a time to the tournament in this category."""
+
+
+class RankCardBusy(DoombotBaseException):
+    """Too many rank cards are waiting to be rendered."""
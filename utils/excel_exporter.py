@@ -4,13 +4,12 @@ from math import ceil
 
 import xlsxwriter
 
-from database.documents import ExperiencePoints
-from database.tournament import Tournament, TournamentData
+from database.tournament import Tournament, TournamentData, TournamentSnapshot
 
 logger = getLogger(__name__)
 
 
-async def init_workbook(tournament: Tournament):
+async def init_workbook(tournament: Tournament, snapshot: TournamentSnapshot):
     workbook = xlsxwriter.Workbook("DPK_Tournament.xlsx")
     grandmaster_ws = workbook.add_worksheet(name="Grandmaster")
     diamond_ws = workbook.add_worksheet(name="Diamond")
@@ -76,7 +75,6 @@ async def init_workbook(tournament: Tournament):
     missions_ws.set_column_pixels(0, 19, width=105)
     missions_ws.set_column(1, 5, cell_format=center_fmt)
     for i, (user_id, data) in enumerate(tournament.xp.items(), start=2):
-        user = await ExperiencePoints.find_user(user_id)
         missions_total = (
             data["easy"] * 500
             + data["medium"] * 1000
@@ -88,7 +86,7 @@ async def init_workbook(tournament: Tournament):
         missions_ws.write_row(
             "A" + str(i),
             [
-                f"{user.alias} ({user.user_id})",
+                f"{snapshot.alias(user_id)} ({user_id})",
                 data["easy"],
                 data["medium"],
                 data["hard"],
@@ -129,20 +127,18 @@ async def init_workbook(tournament: Tournament):
         data: TournamentData = getattr(tournament, category, None)
         if not data:
             continue
-        records = sorted(data.records, key=operator.attrgetter("record"))
+        records = sorted(snapshot.records[category], key=operator.attrgetter("record"))
 
         for record in records:
-            user = await ExperiencePoints.find_user(record.user_id)
-            user_cat_xp = tournament.xp[user.user_id][category]
-            rank = user.rank
-            rank = getattr(rank, category)
+            user_cat_xp = tournament.xp[record.user_id][category]
+            rank = snapshot.rank(record.user_id, category)
             worksheet, tracker_x = ws_map[rank]
             tracker_y = column_map[category][3]
 
             worksheet.write(
                 row_tracker[tracker_x][tracker_y],
                 column_map[category][0],
-                f"{user.alias} ({user.user_id})",
+                f"{snapshot.alias(record.user_id)} ({record.user_id})",
             )
             worksheet.write(
                 row_tracker[tracker_x][tracker_y],
@@ -0,0 +1,52 @@
+from functools import lru_cache
+from typing import Iterable, List
+
+from thefuzz import fuzz
+
+SUGGESTION_LIMIT = 25
+# Minimum partial ratio for a non substring suggestion.
+SUGGESTION_CUTOFF = 60
+CACHE_SIZE = 1024
+
+
+def normalize(value: str) -> str:
+    return " ".join(value.casefold().split())
+
+
+class FuzzyMatcher:
+    """Fuzzy matching against a fixed set of choices.
+
+    Choices are normalized once and results are cached per query.
+    """
+
+    def __init__(self, choices: Iterable[str]):
+        self.choices = list(choices)
+        self._normalized = [normalize(choice) for choice in self.choices]
+        self._sorted = sorted(range(len(self.choices)), key=self.choices.__getitem__)
+        self.best = lru_cache(maxsize=CACHE_SIZE)(self._best)
+        self.suggestions = lru_cache(maxsize=CACHE_SIZE)(self._suggestions)
+
+    def _best(self, value: str) -> str:
+        """Return the closest choice. Ties go to the earliest choice."""
+        value = normalize(value)
+        scores = [fuzz.partial_ratio(value, choice) for choice in self._normalized]
+        return self.choices[scores.index(max(scores))]
+
+    def _suggestions(self, value: str, limit: int = SUGGESTION_LIMIT) -> List[str]:
+        """Return choices containing the value, then other close choices."""
+        value = normalize(value)
+        if not value:
+            return [self.choices[i] for i in self._sorted[:limit]]
+
+        contains = [i for i in self._sorted if value in self._normalized[i]]
+        if len(contains) < limit:
+            scores = {
+                i: fuzz.partial_ratio(value, self._normalized[i])
+                for i in self._sorted
+                if value not in self._normalized[i]
+            }
+            contains += sorted(
+                (i for i, score in scores.items() if score >= SUGGESTION_CUTOFF),
+                key=lambda i: -scores[i],
+            )
+        return [self.choices[i] for i in contains[:limit]]
@@ -0,0 +1,352 @@
+import asyncio
+import hashlib
+import io
+import statistics
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from math import ceil
+from typing import Optional
+
+import discord
+from PIL import Image, ImageDraw
+from pydantic import BaseModel
+
+from utils.assets import ASSET_SCALE, load_assets
+from utils.errors import RankCardBusy
+
+logger = getLogger(__name__)
+
+RANK_CARD_WORKERS = 2
+# Renders allowed to wait for a worker before /rank is turned away.
+RANK_CARD_QUEUE_LIMIT = 8
+# Total size of the encoded cards kept for repeat /rank calls.
+RANK_CARD_CACHE_BYTES = 32 * 1024 * 1024
+# Avatars are requested at the smallest CDN size covering the card's 100 px.
+AVATAR_SIZE = 128
+AVATAR_CACHE_BYTES = 4 * 1024 * 1024
+
+
+class RankCardData(BaseModel):
+    """Everything drawn on a rank card."""
+
+    name: str
+    xp: int
+    ta_rank: str
+    mc_rank: str
+    hc_rank: str
+    wins: int
+    losses: int
+    place: int
+    # Discord's hash of the avatar, so a new avatar changes the cache key.
+    avatar_key: str
+    avatar: Optional[bytes] = None
+
+    def cache_key(self) -> str:
+        """Hash of every input except the avatar bytes, which avatar_key stands for."""
+        return hashlib.sha256(
+            self.json(exclude={"avatar"}, sort_keys=True).encode()
+        ).hexdigest()
+
+
+def format_xp(xp):
+    """Truncate/format numbers over 1000 to 1k format."""
+    if 1000000 > xp > 999:
+        xp = str(float(xp) / 1000)[:-2] + "k"
+    elif xp > 1000000:
+        xp = str(float(xp) / 1000000)[:-3] + "m"
+
+    return str(xp)
+
+
+def find_level(player_xp):
+    """Find a player's level from their XP amount."""
+    total = 0
+    for level in range(101):
+        total += 5 * (level**2) + (50 * level) + 100
+        if total > player_xp:
+            return level
+
+
+def find_portrait(level) -> str:
+    """Find which portrait to use."""
+    number = str(ceil(level % 20 / 4))
+    if number == "0":
+        number = "1"
+    if level <= 20:
+        filename = "bronze" + number + ".png"
+    elif 20 <= level < 40:
+        filename = "silver" + number + ".png"
+    elif 40 <= level < 60:
+        filename = "gold" + number + ".png"
+    elif 60 <= level < 80:
+        filename = "platinum" + number + ".png"
+    elif 80 <= level < 100:
+        filename = "diamond" + number + ".png"
+    else:
+        filename = "diamond5.png"
+    return filename
+
+
+def _scaled(value: int) -> int:
+    """A length on the rank card artwork, at the size cards are drawn at."""
+    return value // ASSET_SCALE
+
+
+def render_rank_card(data: RankCardData) -> bytes:
+    """Draw a rank card and encode it as PNG.
+
+    Layout constants are in artwork pixels and scaled as they are used.
+    """
+    assets = load_assets()
+    ta_logo = assets.logo(data.ta_rank)
+    mc_logo = assets.logo(data.mc_rank)
+    hc_logo = assets.logo(data.hc_rank)
+
+    rank_card = assets.image("rankcard_bg_duels.png")
+
+    old_x = 15
+    old_y = 66
+    x = rank_card.size[0] * ASSET_SCALE  # 1165 + 10
+    y = rank_card.size[1] * ASSET_SCALE  # 348
+    x_offset = 10
+
+    img = Image.new("RGBA", rank_card.size, color=(0, 0, 0, 0))
+    d = ImageDraw.Draw(img, "RGBA")
+
+    img.paste(rank_card)
+
+    with io.BytesIO(data.avatar) as avatar_binary:
+        avatar = Image.open(avatar_binary).convert("RGBA")
+    avatar.thumbnail((_scaled(200), _scaled(200)), Image.LANCZOS)
+    av_mask = Image.new("L", avatar.size, 0)
+    draw = ImageDraw.Draw(av_mask)
+    draw.ellipse((0, 0, _scaled(200), _scaled(200)), fill=255)
+    a_height = avatar.size[1]
+    img.paste(
+        avatar,
+        (_scaled(x_offset * 4 + old_x), (_scaled(y) - a_height) // 2),
+        av_mask,
+    )
+
+    # Portrait PFP
+    portrait = assets.portrait(find_portrait(find_level(data.xp)))
+    img.paste(portrait, (_scaled(-60), _scaled(-30)), portrait)
+
+    rank_x_offset = 50
+    rank_y_offset = 37
+    for x_val, logo in zip([375, 508, 641, 774], [ta_logo, mc_logo, hc_logo]):
+        img.paste(
+            logo,
+            (
+                _scaled(x_val + old_x - rank_x_offset),
+                _scaled(98 + old_y // 2 - rank_y_offset),
+            ),
+            logo,
+        )
+
+    font_file = "segoeui.ttf"
+    font2_file = "avenir.otf"
+    # Username/Discriminator
+    name_font = assets.font(font2_file, 50)
+    name_pos = _scaled(x // 2 + old_x) - d.textlength(data.name, font=name_font) // 2
+    d.text(
+        (name_pos, _scaled(170 + old_y // 2)),
+        data.name,
+        fill=(255, 255, 255),
+        font=name_font,
+    )
+
+    # W/L Duels
+    duels_font = assets.font(font_file, 30)
+    wins = str(data.wins) + " W"
+    losses = str(data.losses) + " L"
+    # between 729 -> 849 is box
+    box_center = _scaled(729 + (849 - 729) // 2)
+    wins_pos = box_center - d.textlength(wins, font=duels_font) // 2
+    losses_pos = box_center - d.textlength(losses, font=duels_font) // 2
+
+    d.text((wins_pos, _scaled(98)), wins, fill=(255, 255, 255), font=duels_font)
+    d.text((losses_pos, _scaled(138)), losses, fill=(255, 255, 255), font=duels_font)
+
+    # XP
+    xp_font = assets.font(font_file, 40)
+    xp = format_xp(data.xp)
+    xp_length = (
+        _scaled(x // 2 + old_x) - d.textlength(f"Total XP: {xp}", font=xp_font) // 2
+    )
+    d.text(
+        (xp_length, _scaled(215 + old_y // 2)),
+        f"Total XP: {xp}",
+        fill=(255, 255, 255),
+        font=xp_font,
+    )
+
+    # Highest Position
+    place = data.place
+    if place == 1:
+        pos_portrait_f = "gold_position.png"
+    elif place == 2:
+        pos_portrait_f = "silver_position.png"
+    elif place == 3:
+        pos_portrait_f = "bronze_position.png"
+    else:
+        pos_portrait_f = "no_position.png"
+
+    color = (9, 10, 11, 255)
+
+    place_circle_x1 = _scaled(x - (x_offset * 4) - 200 - 5)
+    place_circle_x2 = _scaled(x - (x_offset * 4) + 5)
+    place_circle_y1 = _scaled((y - 200) // 2 - 5)
+    place_circle_y2 = _scaled((y - 200) // 2 + 200 + 5)
+
+    d.ellipse(
+        (place_circle_x1, place_circle_y1, place_circle_x2, place_circle_y2),
+        fill=color,
+    )
+
+    if len(str(place)) == 1:
+        place_font_size = 120
+    elif len(str(place)) == 2:
+        place_font_size = 110
+    elif place < 999:
+        place_font_size = 100
+    else:
+        place_font_size = 85
+
+    place_font = assets.font(font_file, place_font_size)
+
+    place_x = (
+        place_circle_x1
+        + (place_circle_x2 - place_circle_x1) // 2
+        - d.textlength(str(place), font=place_font) // 2
+    )
+
+    ascent, _ = place_font.getmetrics()
+    (_, _), (_, offset_y) = place_font.font.getsize(str(place))
+
+    place_y = _scaled(y) // 2 - (ascent - offset_y)
+
+    d.text((place_x, place_y), str(place), fill=(255, 255, 255, 255), font=place_font)
+
+    pos_portrait = assets.portrait(pos_portrait_f)
+    img.paste(pos_portrait, (_scaled(x - 350), _scaled(-28)), pos_portrait)
+
+    with io.BytesIO() as image_binary:
+        img.save(image_binary, "PNG")
+        return image_binary.getvalue()
+
+
+class ImageCache:
+    """LRU of encoded images, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self._images: OrderedDict[str, bytes] = OrderedDict()
+        self._max_bytes = max_bytes
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+        return image
+
+    def put(self, key: str, image: bytes):
+        if len(image) > self._max_bytes:
+            return
+        old = self._images.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._images[key] = image
+        self._bytes += len(image)
+        while self._bytes > self._max_bytes:
+            _, evicted = self._images.popitem(last=False)
+            self._bytes -= len(evicted)
+
+
+class RankCardRenderer:
+    """Renders rank cards in worker threads, off the event loop.
+
+    PIL releases the GIL for compositing, resampling and PNG encoding, and
+    threads share the preloaded assets.
+
+    At most RANK_CARD_QUEUE_LIMIT renders are in flight; beyond that
+    RankCardBusy is raised instead of letting the backlog grow. Rendered
+    cards are kept by the hash of their inputs, so a card is only redrawn
+    once something on it changes.
+    """
+
+    def __init__(
+        self,
+        workers: int = RANK_CARD_WORKERS,
+        queue_limit: int = RANK_CARD_QUEUE_LIMIT,
+        cache_bytes: int = RANK_CARD_CACHE_BYTES,
+    ):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="rank-card"
+        )
+        self._queue_limit = queue_limit
+        self._pending = 0
+        self._cache = ImageCache(cache_bytes)
+        self._avatars = ImageCache(AVATAR_CACHE_BYTES)
+
+    def cached(self, data: RankCardData) -> Optional[bytes]:
+        """A card already rendered from the same inputs, if any."""
+        return self._cache.get(data.cache_key())
+
+    async def avatar(self, asset: discord.Asset) -> bytes:
+        """An avatar as PNG at the size drawn on the card, cached by its hash."""
+        avatar = self._avatars.get(asset.key)
+        if avatar is None:
+            avatar = await asset.replace(size=AVATAR_SIZE, format="png").read()
+            self._avatars.put(asset.key, avatar)
+        return avatar
+
+    async def render(self, data: RankCardData) -> bytes:
+        if self._pending >= self._queue_limit:
+            raise RankCardBusy("Too many rank cards are being drawn, try again soon.")
+        self._pending += 1
+        try:
+            card = await asyncio.get_running_loop().run_in_executor(
+                self._executor, render_rank_card, data
+            )
+        finally:
+            self._pending -= 1
+        self._cache.put(data.cache_key(), card)
+        return card
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def benchmark(runs: int = 200):
+    """Print p50/p99 render times of a typical rank card."""
+    with io.BytesIO() as avatar_binary:
+        Image.new("RGBA", (512, 512), (114, 137, 218, 255)).save(avatar_binary, "PNG")
+        avatar = avatar_binary.getvalue()
+    data = RankCardData(
+        name="DoomBot#0000",
+        xp=123456,
+        ta_rank="Gold",
+        mc_rank="Diamond",
+        hc_rank="Grandmaster",
+        wins=12,
+        losses=3,
+        place=42,
+        avatar_key="benchmark",
+        avatar=avatar,
+    )
+    render_rank_card(data)  # load assets outside the timings
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        render_rank_card(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    percentiles = statistics.quantiles(timings, n=100)
+    print(f"{runs} renders: p50 {percentiles[49]:.1f} ms, p99 {percentiles[98]:.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,16 +1,20 @@
 import math
-import re
+from itertools import groupby
+from typing import Dict, List, Tuple
 
 import discord
 
 from database.documents import VerificationViews
-from database.records import Record
+from database.maps import Map
+from database.records import Record, WorldRecord, display_level_record
 from utils.constants import VERIFICATION_CHANNEL_ID
 from utils.embed import create_embed, records_wr_user_embed_fields, split_embeds
 from utils.enums import Emoji
 from utils.errors import SearchNotFound
-from utils.utilities import display_record
-from views.paginator import Paginator
+from views.paginator import LazyPaginator, Paginator
+
+PB_PAGE_SIZE = 10
+FIELD_VALUE_LIMIT = 1024
 
 
 async def delete_hidden(interaction: discord.Interaction, record_document: Record):
@@ -36,7 +40,7 @@ async def world_records(interaction: discord.Interaction, target: discord.Member
     await interaction.response.defer(ephemeral=True)
 
     embed = create_embed(title="World Records", desc="", user=target)
-    records = await Record.find_world_records_user(target.id)
+    records = await WorldRecord.find_user(target.id)
     if not records:
         raise SearchNotFound("No records found.")
 
@@ -49,62 +53,54 @@ async def world_records(interaction: discord.Interaction, target: discord.Member
 async def personal_best(interaction: discord.Interaction, target: discord.Member):
     """Find and display personal bests of a specific member."""
     await interaction.response.defer(ephemeral=True)
-    records = await Record.find_rec_map_info(user_id=target.id)
-    if not records:
+    count = await Record.count_user(target.id)
+    if not count:
         raise SearchNotFound("No records found.")
 
-    embed = create_embed(title="Personal Bests", desc="", user=target)
-    embed_dict = {}
-    cur_map = None
-    map_name, creator = None, None
-    for r in records:
-        if r.code != cur_map:
-            cur_map = r.code
-            creator = getattr(getattr(r, "map_data", None), "creator", "N/A")
-            map_name = getattr(getattr(r, "map_data", None), "map_name", "N/A")
-
-        if embed_dict.get(r.code) is None:
-            embed_dict[r.code] = {
-                "title": f"{r.code} - {map_name} by {creator}\n",
-                "value": "",
-            }
-        embed_dict[r.code]["value"] += (
-            f"> **{discord.utils.escape_markdown(r.level)}**\n"
-            f"> Record: {display_record(r.record)}\n"
-            f"> Verified: {Emoji.is_verified(r.verified)}\n"
-            f"━━━━━━━━━━━━\n"
-        )
-
-    embeds = []
-
-    # if over 1024 char limit
-    # split pbs dict value into list of individual pbs
-    # and divide in half.. Add two fields instead of just one.
-    if len(embed_dict) > 0:
-
-        delimiter_regex = r">.*\n>.*\n>.*\n━━━━━━━━━━━━\n"
+    # (code, level_key) of the last record before each page, for range queries.
+    cursors: Dict[int, Tuple[str, str]] = {}
 
-        for i, map_pbs in enumerate(embed_dict.values()):
-            pb_split = re.findall(delimiter_regex, map_pbs["value"])
-            splits_amount = (len(map_pbs["value"]) // 1024) + 1
-            splits_length = math.ceil(len(pb_split) / splits_amount)
-
-            chunks = [
-                pb_split[splits_length * x : splits_length * (x + 1)]
-                for x in range(int(len(pb_split) / splits_length + 1))
-            ]
+    async def fetch_page(index: int) -> discord.Embed:
+        records = await Record.find_personal_bests_page(
+            target.id,
+            PB_PAGE_SIZE,
+            after=cursors.get(index),
+            skip=index * PB_PAGE_SIZE,
+        )
+        if records:
+            cursors[index + 1] = (records[-1].code, records[-1].level_key)
+        return await personal_best_page(target, records)
 
-            for chunk in chunks:
-                if len(chunk) > 0:
-                    embed.add_field(
-                        name=f"{map_pbs['title']}",
-                        value="".join(chunk),
-                        inline=False,
-                    )
+    view = LazyPaginator(math.ceil(count / PB_PAGE_SIZE), fetch_page, interaction.user)
+    await view.start(interaction)
 
-            if (i + 1) % 3 == 0 or (i + 1) == len(embed_dict):
-                embeds.append(embed)
-                embed = discord.Embed(title=target.name)
 
-    view = Paginator(embeds, interaction.user)
-    await view.start(interaction)
+async def personal_best_page(
+    target: discord.Member, records: List[Record]
+) -> discord.Embed:
+    """Personal bests embed with a field per map, split to fit the field limit."""
+    maps = {
+        map_.code: map_
+        for map_ in await Map.find_codes(list({r.code for r in records}))
+    }
+    embed = create_embed(title="Personal Bests", desc="", user=target)
+    for code, map_records in groupby(records, key=lambda r: r.code):
+        map_ = maps.get(code)
+        name = (
+            f"{code} - {getattr(map_, 'map_name', 'N/A')} "
+            f"by {getattr(map_, 'creator', 'N/A')}\n"
+        )
+        value = ""
+        for r in map_records:
+            pb = (
+                f"> **{discord.utils.escape_markdown(r.level)}**\n"
+                f"> Record: {display_level_record(r.code, r.level_key, r.record)}\n"
+                f"> Verified: {Emoji.is_verified(r.verified)}\n"
+                f"━━━━━━━━━━━━\n"
+            )
+            if value and len(value) + len(pb) > FIELD_VALUE_LIMIT:
+                embed.add_field(name=name, value=value, inline=False)
+                value = ""
+            value += pb
+        embed.add_field(name=name, value=value, inline=False)
+    return embed
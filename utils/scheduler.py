@@ -0,0 +1,144 @@
+import asyncio
+import datetime
+import functools
+import heapq
+import itertools
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = getLogger(__name__)
+
+# Tournaments mark a finished schedule with this date instead of removing it.
+SENTINEL = datetime.datetime(year=1, month=1, day=1)
+
+# Event channels are opened this long before the scheduled start.
+EVENT_LEAD_TIME = datetime.timedelta(minutes=3)
+
+# Upper bound on a single sleep, so clock adjustments are picked up eventually.
+MAX_SLEEP = 3600
+
+JobHandler = Callable[[Any], Awaitable[None]]
+Job = Tuple[datetime.datetime, int, str, Any]
+
+
+def normalize_deadline(when: datetime.datetime) -> datetime.datetime:
+    """Convert timezone aware datetimes into naive local time like datetime.now()."""
+    if when.tzinfo is not None:
+        return when.astimezone().replace(tzinfo=None)
+    return when
+
+
+class Scheduler:
+    """Deadline driven job runner.
+
+    Deadlines are kept in a min-heap and the runner sleeps until the earliest one
+    is due. Scheduling a new deadline wakes the runner so it can re-arm. Due
+    handlers run in their own tasks, so a slow or failing handler never holds
+    up the runner. Jobs with the same kind and key run in order, and so do all
+    jobs of a serialized kind.
+    Handlers receive the key they were scheduled with and must re-check the
+    current state of their document, since an edited document leaves its
+    previous deadline in the heap.
+    """
+
+    def __init__(self):
+        self._heap: List[Job] = []
+        self._pending: Set[Tuple[datetime.datetime, str, Any]] = set()
+        self._counter = itertools.count()
+        self._handlers: Dict[str, JobHandler] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._serialized: Set[str] = set()
+        # Latest running job of each kind and key, or of each serialized kind.
+        self._running: Dict[Any, asyncio.Task] = {}
+
+    def register(
+        self, kind: str, handler: JobHandler, serialized: bool = False
+    ) -> None:
+        """Register the coroutine that runs when a deadline of this kind is due.
+
+        Jobs of different keys run concurrently, so a handler must only touch
+        the document of its own key. Handlers that touch shared state must be
+        registered as serialized, which runs every job of the kind in order.
+        """
+        self._handlers[kind] = handler
+        if serialized:
+            self._serialized.add(kind)
+        else:
+            self._serialized.discard(kind)
+
+    def schedule(self, kind: str, when: Optional[datetime.datetime], key: Any) -> None:
+        """Add a deadline. Empty and sentinel deadlines are ignored."""
+        if when is None:
+            return
+        when = normalize_deadline(when)
+        if when == SENTINEL or (when, kind, key) in self._pending:
+            return
+        self._pending.add((when, kind, key))
+        heapq.heappush(self._heap, (when, next(self._counter), kind, key))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def next_deadline(self) -> Optional[datetime.datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = (self._heap[0][0] - datetime.datetime.now()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=min(delay, MAX_SLEEP)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            when, _, kind, key = heapq.heappop(self._heap)
+            self._pending.discard((when, kind, key))
+            self._dispatch(kind, key)
+
+    def _dispatch(self, kind: str, key: Any) -> None:
+        """Run a due handler in its own task, after any earlier job it must follow."""
+        lock = kind if kind in self._serialized else (kind, key)
+        previous = self._running.get(lock)
+        task = asyncio.create_task(self._run_job(kind, key, previous))
+        self._running[lock] = task
+        task.add_done_callback(functools.partial(self._job_done, lock, kind, key))
+
+    async def _run_job(
+        self, kind: str, key: Any, previous: Optional[asyncio.Task]
+    ) -> None:
+        if previous:
+            # Only wait for it; its failure has already been logged.
+            await asyncio.wait([previous])
+        await self._handlers[kind](key)
+
+    def _job_done(self, lock: Any, kind: str, key: Any, task: asyncio.Task) -> None:
+        if self._running.get(lock) is task:
+            del self._running[lock]
+        if task.cancelled():
+            return
+        exception = task.exception()
+        if exception:
+            logger.error(
+                f"Scheduled job failed: {kind} {key}",
+                exc_info=(type(exception), exception, exception.__traceback__),
+            )
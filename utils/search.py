@@ -0,0 +1,58 @@
+from typing import Dict, Iterable, List, Set
+
+# Longest n-gram indexed. Longer queries intersect their trigrams.
+NGRAM_SIZE = 3
+SEARCH_LIMIT = 25
+
+
+def ngrams(text: str, size: int) -> Set[str]:
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+class SearchIndex:
+    """Case-insensitive substring search over a fixed list of strings.
+
+    Entries are casefolded once and indexed by every n-gram up to
+    NGRAM_SIZE characters. A query only checks the entries that contain all
+    of its n-grams. Prefix matches are ranked before other matches, and
+    each group keeps the original order of the entries.
+    """
+
+    def __init__(self, entries: Iterable[str]):
+        self.entries = list(dict.fromkeys(entries))
+        self._folded = [entry.casefold() for entry in self.entries]
+        self._postings: Dict[str, Set[int]] = {}
+        for i, folded in enumerate(self._folded):
+            for size in range(1, NGRAM_SIZE + 1):
+                for gram in ngrams(folded, size):
+                    self._postings.setdefault(gram, set()).add(i)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _candidates(self, query: str) -> List[int]:
+        grams = ngrams(query, min(len(query), NGRAM_SIZE))
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+        return sorted(candidates)
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> List[str]:
+        """Return up to `limit` entries containing the query."""
+        query = query.casefold()
+        if not query:
+            return self.entries[:limit]
+
+        prefix, substring = [], []
+        for i in self._candidates(query):
+            folded = self._folded[i]
+            if folded.startswith(query):
+                prefix.append(self.entries[i])
+                if len(prefix) == limit:
+                    break
+            elif len(substring) < limit and query in folded:
+                substring.append(self.entries[i])
+        return (prefix + substring)[:limit]
@@ -0,0 +1,57 @@
+import asyncio
+from logging import getLogger
+from typing import Dict, Set, Tuple
+
+import discord
+
+logger = getLogger(__name__)
+
+# Reactions on the same message within this many seconds share one edit.
+STARBOARD_EDIT_WINDOW = 5
+
+
+class StarboardCoalescer:
+    """Collapse starboard message edits.
+
+    The first update of a starboard message starts a short window. Later
+    updates in that window only replace the pending content, and a single
+    edit is sent when the window closes. Reactions are handled concurrently
+    and can arrive out of order, so the content with the most stars wins
+    rather than the last one queued.
+    """
+
+    def __init__(self, window: float = STARBOARD_EDIT_WINDOW):
+        self.window = window
+        self.requested = 0
+        self.edits = 0
+        self._pending: Dict[int, Tuple[int, str]] = {}
+        self._messages: Dict[int, discord.PartialMessage] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def saved(self) -> int:
+        """Number of edits that were collapsed into another edit."""
+        return self.requested - self.edits - len(self._pending)
+
+    def update(self, message: discord.PartialMessage, stars: int, content: str) -> None:
+        """Queue new content for a starboard message showing a star count."""
+        self.requested += 1
+        pending = self._pending.get(message.id)
+        first = pending is None
+        if first or stars >= pending[0]:
+            self._pending[message.id] = (stars, content)
+        self._messages[message.id] = message
+        if first:
+            task = asyncio.create_task(self._flush(message.id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, message_id: int):
+        await asyncio.sleep(self.window)
+        _, content = self._pending.pop(message_id)
+        message = self._messages.pop(message_id)
+        self.edits += 1
+        try:
+            await message.edit(content=content)
+        except discord.HTTPException:
+            logger.exception(f"Starboard edit failed: {message_id}")
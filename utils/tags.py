@@ -0,0 +1,66 @@
+from logging import getLogger
+from typing import Dict, List, Optional
+
+from database.documents import Tags
+from utils.search import SearchIndex
+from utils.utilities import logging_util
+
+logger = getLogger(__name__)
+
+
+class TagCatalogue:
+    """In-memory copy of every tag, grouped by category.
+
+    Loaded on first use and dropped whenever a tag is created or deleted.
+    The version guards against storing a load that started before an
+    invalidation.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._tags: Optional[Dict[str, Dict[str, str]]] = None
+        self._indexes: Dict[Optional[str], SearchIndex] = {}
+
+    def invalidate(self):
+        self.version += 1
+        self._tags = None
+        self._indexes = {}
+
+    async def _catalogue(self) -> Dict[str, Dict[str, str]]:
+        if self._tags is not None:
+            return self._tags
+
+        version = self.version
+        catalogue = {}
+        for tag in await Tags.find().sort("+name").to_list():
+            catalogue.setdefault(tag.category, {})[tag.name] = tag.content
+        catalogue = {category: catalogue[category] for category in sorted(catalogue)}
+
+        if version == self.version:
+            self._tags = catalogue
+            logger.info(logging_util("Tags Loaded", f"VERSION {version}"))
+        return catalogue
+
+    async def categories(self) -> List[str]:
+        return list(await self._catalogue())
+
+    async def names(self, category: str) -> List[str]:
+        return list((await self._catalogue()).get(category, {}))
+
+    async def content(self, category: str, name: str) -> Optional[str]:
+        return (await self._catalogue()).get(category, {}).get(name)
+
+    async def category_index(self) -> SearchIndex:
+        return await self._index(None)
+
+    async def name_index(self, category: str) -> SearchIndex:
+        return await self._index(category)
+
+    async def _index(self, category: Optional[str]) -> SearchIndex:
+        index = self._indexes.get(category)
+        if index is None:
+            catalogue = await self._catalogue()
+            index = SearchIndex(catalogue if category is None else catalogue[category])
+            if self._tags is catalogue:
+                self._indexes[category] = index
+        return index
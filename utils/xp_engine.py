@@ -0,0 +1,371 @@
+"""Tournament XP engine.
+
+Pure, synchronous XP computation over columnar tournament records.
+One row per submission: user, category, rank and time.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+XP_MULTIPLIER = {
+    "ta": 0.14094,
+    "mc": 0.3654,
+    "hc": 0.8352,
+    "bo": 0.3654,
+}
+CATEGORIES = ["ta", "mc", "hc", "bo"]
+RANKS = ["Unranked", "Gold", "Diamond", "Grandmaster"]
+
+MISSION_POINTS = {
+    "expert": 2000,
+    "hard": 1500,
+    "medium": 1000,
+    "easy": 500,
+}
+
+# Hardest to easiest, because only the highest mission counts.
+MISSION_CATEGORIES = ["expert", "hard", "medium", "easy"]
+
+GENERAL_MISSION_POINTS = 2000
+
+# Mission type and target.
+Mission = Tuple[Optional[str], Any]
+
+
+class XPTable:
+    """Per user XP columns, in order of each user's first submission."""
+
+    COUNT_COLUMNS = ["easy", "medium", "hard", "expert", "general"]
+    XP_COLUMNS = CATEGORIES + ["xp"]
+
+    def __init__(self, user_ids: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.user_ids = user_ids
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def row(self, user_id: int) -> Optional[Dict[str, Union[int, float]]]:
+        """Return one user's XP breakdown."""
+        index = np.flatnonzero(self.user_ids == user_id)
+        if not len(index):
+            return None
+        return self._row(index[0])
+
+    def _row(self, i: int) -> Dict[str, Union[int, float]]:
+        row = {}
+        for column in self.COUNT_COLUMNS:
+            row[column] = int(self.columns[column][i])
+        for column in self.XP_COLUMNS:
+            row[column] = float(self.columns[column][i])
+        return row
+
+    def to_store(self) -> Dict[int, Dict[str, Union[int, float]]]:
+        """Convert into the XP dictionary stored on the tournament document."""
+        store = {}
+        for i, user_id in enumerate(self.user_ids):
+            row = self._row(i)
+            for category in CATEGORIES:
+                row[f"{category}_cur_avg"] = 0
+            store[int(user_id)] = row
+        return store
+
+
+def leaderboard_xp(times: np.ndarray, category: str) -> np.ndarray:
+    """Leaderboard XP of every record in one rank bucket of a category."""
+    top_record = times.min()
+    formula = (1 - (times - top_record) / (XP_MULTIPLIER[category] * top_record)) * 2500
+    return np.where(formula < 100, 100, formula)
+
+
+def bucket_positions(times: np.ndarray) -> np.ndarray:
+    """Zero based leaderboard position of every record in one rank bucket."""
+    order = np.argsort(times, kind="stable")
+    positions = np.empty(len(times), dtype=np.int64)
+    positions[order] = np.arange(len(times))
+    return positions
+
+
+def difficulty_missions(
+    times: np.ndarray, missions: Dict[str, Mission]
+) -> Dict[str, np.ndarray]:
+    """Mask of records completing each difficulty. Only the hardest one counts."""
+    awarded = np.zeros(len(times), dtype=bool)
+    completed = {}
+    for difficulty in MISSION_CATEGORIES:
+        type_, target = missions.get(difficulty, (None, None))
+        if type_ == "sub":
+            hit = times < float(target)
+        elif type_ == "complete":
+            hit = times != 0
+        else:
+            hit = np.zeros(len(times), dtype=bool)
+        completed[difficulty] = hit & ~awarded
+        awarded |= hit
+    return completed
+
+
+def general_missions(
+    columns: Dict[str, np.ndarray], top_three: np.ndarray, general: List[Mission]
+) -> None:
+    """Apply general missions in order, in place."""
+    encompass_missions = {
+        "easy": columns["easy"]
+        + columns["medium"]
+        + columns["hard"]
+        + columns["expert"],
+        "medium": columns["medium"] + columns["hard"] + columns["expert"],
+        "hard": columns["hard"] + columns["expert"],
+        "expert": columns["expert"],
+    }
+    for type_, target in general:
+        if type_ == "xp":
+            hit = columns["xp"] > int(target)
+        elif type_ == "missions":
+            split = str(target).split()
+            if len(split) != 2:
+                continue
+            hit = encompass_missions[split[1].lower()] >= int(split[0])
+        elif type_ == "top":
+            hit = top_three >= int(target)
+        else:
+            continue
+        columns["general"][hit] += 1
+        columns["xp"][hit] += GENERAL_MISSION_POINTS
+
+
+def tournament_columns(tournament, snapshot) -> Dict[str, Any]:
+    """Columnar input for every record of a tournament and its snapshot.
+
+    Takes a Tournament document and the TournamentSnapshot loaded from it.
+    """
+    columns = {
+        "user_ids": [],
+        "categories": [],
+        "ranks": [],
+        "times": [],
+        "missions": {},
+        "general": [(m.type, m.target) for m in tournament.general if m],
+    }
+    for category in CATEGORIES:
+        category_attr = getattr(tournament, category, None)
+        if not category_attr:
+            continue
+        missions = {}
+        for difficulty in MISSION_CATEGORIES:
+            mission = getattr(category_attr.missions, difficulty)
+            missions[difficulty] = (mission.type, mission.target)
+        columns["missions"][category] = missions
+        for record in snapshot.records[category]:
+            columns["user_ids"].append(record.user_id)
+            columns["categories"].append(category)
+            columns["ranks"].append(snapshot.rank(record.user_id, category))
+            columns["times"].append(record.record)
+    return columns
+
+
+def compute_tournament_xp(
+    user_ids: Sequence[int],
+    categories: Sequence[str],
+    ranks: Sequence[str],
+    times: Sequence[float],
+    missions: Dict[str, Dict[str, Mission]],
+    general: List[Mission],
+) -> XPTable:
+    """Compute leaderboard, difficulty mission and general mission XP.
+
+    Rows must be grouped by category in CATEGORIES order, each category in
+    submission order, which is the order XP is accumulated in.
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    categories = np.asarray(categories, dtype=object)
+    ranks = np.asarray(ranks, dtype=object)
+    times = np.asarray(times, dtype=np.float64)
+
+    unique_ids, first_seen, inverse = np.unique(
+        user_ids, return_index=True, return_inverse=True
+    )
+    # Keep users in order of their first submission.
+    order = np.argsort(first_seen, kind="stable")
+    user_index = np.empty(len(unique_ids), dtype=np.int64)
+    user_index[order] = np.arange(len(unique_ids))
+    rows = user_index[inverse]
+    users = unique_ids[order]
+
+    columns = {
+        column: np.zeros(len(users), dtype=np.int64) for column in XPTable.COUNT_COLUMNS
+    }
+    columns.update({column: np.zeros(len(users)) for column in XPTable.XP_COLUMNS})
+    top_three = np.zeros(len(users), dtype=np.int64)
+
+    # Leaderboard
+    for category in CATEGORIES:
+        in_category = categories == category
+        if not in_category.any():
+            continue
+        category_xp = np.zeros(len(times))
+        in_top_three = np.zeros(len(times), dtype=bool)
+        for rank in RANKS:
+            bucket = np.flatnonzero(in_category & (ranks == rank))
+            if not len(bucket):
+                continue
+            category_xp[bucket] = leaderboard_xp(times[bucket], category)
+            in_top_three[bucket] = bucket_positions(times[bucket]) < 3
+
+        category_rows = rows[in_category]
+        np.add.at(columns[category], category_rows, category_xp[in_category])
+        np.add.at(columns["xp"], category_rows, category_xp[in_category])
+        np.add.at(top_three, category_rows[in_top_three[in_category]], 1)
+
+    # Difficulty Missions
+    for category in CATEGORIES:
+        in_category = categories == category
+        if category not in missions or not in_category.any():
+            continue
+        category_rows = rows[in_category]
+        completed = difficulty_missions(times[in_category], missions[category])
+        points = np.zeros(len(category_rows), dtype=np.int64)
+        for difficulty, hit in completed.items():
+            np.add.at(columns[difficulty], category_rows[hit], 1)
+            points[hit] = MISSION_POINTS[difficulty]
+        hit = points > 0
+        np.add.at(columns["xp"], category_rows[hit], points[hit])
+
+    # General Missions
+    general_missions(columns, top_three, general)
+
+    return XPTable(users, columns)
+
+
+Bucket = Tuple[str, str]
+
+
+class ProvisionalXP:
+    """XP standings of an active tournament, maintained per submission.
+
+    Records are kept per (category, rank) bucket together with their
+    leaderboard XP. A submission only changes the top record of its own
+    bucket, so only that bucket is recomputed. Mission XP only depends on a
+    user's own time and general missions are applied when standings are read.
+    """
+
+    def __init__(
+        self,
+        tournament_id: int,
+        missions: Dict[str, Dict[str, Mission]],
+        general: List[Mission],
+    ):
+        self.tournament_id = tournament_id
+        self.missions = missions
+        self.general = general
+        # Users in order of their first submission.
+        self._users: Dict[int, None] = {}
+        self._buckets: Dict[int, Dict[str, str]] = {}
+        self._times: Dict[Bucket, Dict[int, float]] = {}
+        self._leaderboard: Dict[Bucket, Dict[int, Tuple[float, bool]]] = {}
+        self._difficulty: Dict[Tuple[int, str], Optional[str]] = {}
+
+    @classmethod
+    def from_columns(
+        cls,
+        tournament_id: int,
+        user_ids: Sequence[int],
+        categories: Sequence[str],
+        ranks: Sequence[str],
+        times: Sequence[float],
+        missions: Dict[str, Dict[str, Mission]],
+        general: List[Mission],
+    ) -> "ProvisionalXP":
+        """Build standings from the same columns compute_tournament_xp takes."""
+        provisional = cls(tournament_id, missions, general)
+        changed = set()
+        for user_id, category, rank, time in zip(user_ids, categories, ranks, times):
+            changed |= provisional._place(user_id, category, rank, time)
+        for bucket in changed:
+            provisional._recompute(bucket)
+        return provisional
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def submit(self, user_id: int, category: str, rank: str, time: float) -> None:
+        """Add or replace a user's record and recompute the affected buckets."""
+        for bucket in self._place(user_id, category, rank, time):
+            self._recompute(bucket)
+
+    def remove(self, user_id: int, category: str) -> None:
+        """Remove a user's record from a category."""
+        rank = self._buckets.get(user_id, {}).pop(category, None)
+        if rank is None:
+            return
+        self._difficulty.pop((user_id, category), None)
+        del self._times[(category, rank)][user_id]
+        self._recompute((category, rank))
+        if not self._buckets[user_id]:
+            del self._buckets[user_id]
+            del self._users[user_id]
+
+    def _place(self, user_id: int, category: str, rank: str, time: float) -> set:
+        changed = {(category, rank)}
+        previous = self._buckets.setdefault(user_id, {}).get(category)
+        if previous is not None and previous != rank:
+            del self._times[(category, previous)][user_id]
+            changed.add((category, previous))
+
+        self._users.setdefault(user_id, None)
+        self._buckets[user_id][category] = rank
+        self._times.setdefault((category, rank), {})[user_id] = time
+
+        self._difficulty[(user_id, category)] = None
+        if category in self.missions:
+            completed = difficulty_missions(np.array([time]), self.missions[category])
+            for difficulty, hit in completed.items():
+                if hit[0]:
+                    self._difficulty[(user_id, category)] = difficulty
+        return changed
+
+    def _recompute(self, bucket: Bucket) -> None:
+        records = self._times.get(bucket)
+        if not records:
+            self._times.pop(bucket, None)
+            self._leaderboard.pop(bucket, None)
+            return
+        category, _ = bucket
+        times = np.fromiter(records.values(), dtype=np.float64, count=len(records))
+        xp = leaderboard_xp(times, category)
+        top_three = bucket_positions(times) < 3
+        self._leaderboard[bucket] = {
+            user_id: (float(xp[i]), bool(top_three[i]))
+            for i, user_id in enumerate(records)
+        }
+
+    def standings(self) -> XPTable:
+        """Current XP of every participant if the tournament ended now."""
+        users = np.fromiter(self._users, dtype=np.int64, count=len(self._users))
+        index = {user_id: i for i, user_id in enumerate(self._users)}
+        columns = {
+            column: np.zeros(len(users), dtype=np.int64)
+            for column in XPTable.COUNT_COLUMNS
+        }
+        columns.update({column: np.zeros(len(users)) for column in XPTable.XP_COLUMNS})
+        top_three = np.zeros(len(users), dtype=np.int64)
+
+        for category in CATEGORIES:
+            for rank in RANKS:
+                for user_id, (xp, top) in self._leaderboard.get(
+                    (category, rank), {}
+                ).items():
+                    i = index[user_id]
+                    columns[category][i] += xp
+                    columns["xp"][i] += xp
+                    top_three[i] += top
+
+        for (user_id, _), difficulty in self._difficulty.items():
+            if difficulty is None:
+                continue
+            i = index[user_id]
+            columns[difficulty][i] += 1
+            columns["xp"][i] += MISSION_POINTS[difficulty]
+
+        general_missions(columns, top_three, self.general)
+        return XPTable(users, columns)
@@ -1,15 +1,16 @@
-from copy import deepcopy
-from typing import List, Union
+from typing import Awaitable, Callable, Dict, List, Optional, Union
 
 import discord
 
+Page = Union[discord.Embed, str]
+
 
 class Paginator(discord.ui.View):
     """ "A view for paginating multiple embeds."""
 
     def __init__(
         self,
-        embeds: List[Union[discord.Embed, str]],
+        embeds: Optional[List[Page]],
         author: discord.Member,
         timeout=None,
     ):
@@ -18,52 +19,46 @@ class Paginator(discord.ui.View):
         self.pages = embeds
         self.author = author
         self._curr_page = 0
-        if len(self.pages) == 1:
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    async def get_page(self, index: int) -> Page:
+        """The page at an index, with a footer showing its position."""
+        return self.format_page(self.pages[index], index)
+
+    def format_page(self, page: Page, index: int) -> Page:
+        if isinstance(page, str):
+            return page
+
+        page = page.copy()  # don't change the footer of the original
+        position = f"({index + 1}/{self.page_count})"
+        if page.footer.text == discord.Embed.Empty:
+            page.set_footer(text=position)
+        elif page.footer.icon_url == discord.Embed.Empty:
+            page.set_footer(text=f"{page.footer.text} - {position}")
+        else:
+            page.set_footer(
+                icon_url=page.footer.icon_url,
+                text=f"{page.footer.text} - {position}",
+            )
+        return page
+
+    async def start(self, interaction: discord.Interaction):
+        if self.page_count == 1:
             self.first.disabled = True
             self.back.disabled = True
             self.next.disabled = True
             self.last.disabled = True
 
-    async def start(self, interaction: discord.Interaction):
-        if isinstance(self.pages[0], str):
-            await interaction.edit_original_message(
-                content=self.formatted_pages[0],
-                view=self,
-            )
+        page = await self.get_page(0)
+        if isinstance(page, str):
+            await interaction.edit_original_message(content=page, view=self)
         else:
-
-            await interaction.edit_original_message(
-                embed=self.formatted_pages[0],
-                view=self,
-            )
+            await interaction.edit_original_message(embed=page, view=self)
         await self.wait()
 
-    @property
-    def formatted_pages(self) -> Union[List[Union[discord.Embed, str]], None]:
-        """The embeds with formatted footers to act as pages."""
-        if not self.pages:
-            return None
-
-        if isinstance(self.pages[0], str):
-            return self.pages
-
-        pages = deepcopy(self.pages)  # copy by value not reference
-        for page in pages:
-            if page.footer.text == discord.Embed.Empty:
-                page.set_footer(text=f"({pages.index(page) + 1}/{len(pages)})")
-            else:
-                page_index = pages.index(page)
-                if page.footer.icon_url == discord.Embed.Empty:
-                    page.set_footer(
-                        text=f"{page.footer.text} - ({page_index + 1}/{len(pages)})"
-                    )
-                else:
-                    page.set_footer(
-                        icon_url=page.footer.icon_url,
-                        text=f"{page.footer.text} - ({page_index + 1}/{len(pages)})",
-                    )
-        return pages
-
     async def interaction_check(self, item, interaction: discord.Interaction) -> bool:
         """Check if the interaction user is the original users who started the interaction."""
         if interaction.user == self.author:
@@ -78,7 +73,7 @@ class Paginator(discord.ui.View):
     @discord.ui.button(label="First", emoji="⏮")
     async def first(self, button: discord.ui.Button, interaction: discord.Interaction):
         """Button component to return to the first pagination page."""
-        if len(self.pages) == 1:
+        if self.page_count == 1:
             button.disabled = True
         self._curr_page = 0
         return await self.change_page(interaction)
@@ -86,31 +81,28 @@ class Paginator(discord.ui.View):
     @discord.ui.button(label="Back", emoji="◀")
     async def back(self, button: discord.ui.Button, interaction: discord.Interaction):
         """Button component to go back to the last pagination page."""
-        if len(self.pages) == 1:
+        if self.page_count == 1:
             button.disabled = True
         if self._curr_page == 0:
-            self._curr_page = len(self.pages) - 1
+            self._curr_page = self.page_count - 1
         else:
             self._curr_page -= 1
 
         return await self.change_page(interaction)
 
     async def change_page(self, interaction):
-        if isinstance(self.pages[0], str):
-            await interaction.response.edit_message(
-                content=self.formatted_pages[self._curr_page], view=self
-            )
+        page = await self.get_page(self._curr_page)
+        if isinstance(page, str):
+            await interaction.response.edit_message(content=page, view=self)
             return
-        await interaction.response.edit_message(
-            embed=self.formatted_pages[self._curr_page], view=self
-        )
+        await interaction.response.edit_message(embed=page, view=self)
 
     @discord.ui.button(label="Next", emoji="▶")
     async def next(self, button: discord.ui.Button, interaction: discord.Interaction):
         """Button component to go to the next pagination page."""
-        if len(self.pages) == 1:
+        if self.page_count == 1:
             button.disabled = True
-        if self._curr_page == len(self.pages) - 1:
+        if self._curr_page == self.page_count - 1:
             self._curr_page = 0
         else:
             self._curr_page += 1
@@ -120,8 +112,33 @@ class Paginator(discord.ui.View):
     @discord.ui.button(label="Last", emoji="⏭")
     async def last(self, button: discord.ui.Button, interaction: discord.Interaction):
         """Button component to go to the last pagination page."""
-        if len(self.pages) == 1:
+        if self.page_count == 1:
             button.disabled = True
-        self._curr_page = len(self.pages) - 1
+        self._curr_page = self.page_count - 1
 
         return await self.change_page(interaction)
+
+
+class LazyPaginator(Paginator):
+    """A paginator that builds each page only when it is first viewed."""
+
+    def __init__(
+        self,
+        page_count: int,
+        fetch_page: Callable[[int], Awaitable[Page]],
+        author: discord.Member,
+        timeout=None,
+    ):
+        super().__init__(None, author, timeout=timeout)
+        self._page_count = page_count
+        self._fetch_page = fetch_page
+        self._cache: Dict[int, Page] = {}
+
+    @property
+    def page_count(self) -> int:
+        return self._page_count
+
+    async def get_page(self, index: int) -> Page:
+        if index not in self._cache:
+            self._cache[index] = await self._fetch_page(index)
+        return self.format_page(self._cache[index], index)
@@ -1,7 +1,7 @@
 import discord
 
 from database.documents import ExperiencePoints
-from database.records import Record
+from database.records import Record, WorldRecord
 from utils.constants import NON_SPR_RECORDS_ID, SPR_RECORDS_ID
 from utils.enums import Emoji
 from utils.records import delete_hidden
@@ -75,6 +75,10 @@ async def verification(interaction: discord.Interaction, verified: bool):
     await delete_hidden(interaction, search)
     search.verified = data["bool"]
     await search.save()
+    if search.verified:
+        await WorldRecord.offer(search)
+    else:
+        await WorldRecord.recompute(search.code, search.level_key)
 
 
 async def find_orig_msg(interaction, search: Record):
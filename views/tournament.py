@@ -216,6 +216,7 @@ class DuelReadyView(discord.ui.View):
         )
         duel.message = new_message.id
         await duel.save()
+        interaction.client.scheduler.schedule("duel", duel.end_time, duel.id)
 
     @discord.ui.button(label="CANCEL", style=discord.ButtonStyle.red)
     async def cancel(self, button: discord.ui.Button, interaction: discord.Interaction):